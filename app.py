@@ -1,7 +1,29 @@
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Flask, render_template, stream_template, request, redirect, url_for, jsonify, session, g, flash
 import os
+import sys
 import time
 import heapq
+import bisect
+import itertools
+import csv
+import io
+import json
+import base64
+import atexit
+import functools
+import threading
+import socket
+import uuid
+from array import array
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from columns import ContactColumns
+from name_index import SortedNameIndex
+from oplog import OperationLog
+from storage import (CATEGORY_PATH_LENGTH, NAME_LENGTH, PRIORITY_MAX, PRIORITY_MIN,
+                     WriteBehindQueue, create_store, encode_category_path)
+from sorting import merge_sort
 
 #Configure SQLAlchemy connection string based on docker-compose environment variables
 
@@ -21,19 +43,129 @@ MSSQL_DB = os.getenv('MSSQL_DB', 'contact_db')
 POSTGRES_CONNECTION_STRING = f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 MSSQL_CONNECTION_STRING = f"mssql+pyodbc://{MSSQL_USER}:{MSSQL_PASSWORD}@{MSSQL_HOST}:{MSSQL_PORT}/{MSSQL_DB}?driver=ODBC+Driver+17+for+SQL+Server"
 
+SQLITE_CONNECTION_STRING = os.getenv('SQLITE_URL', 'sqlite:///contacts.db')
+
+# Persistent storage: set CONTACT_STORE to postgres, mssql or sqlite to mirror
+# contacts into that database. Left empty, contacts live only in memory and the
+# sample book is loaded on start.
+CONTACT_STORE = os.getenv('CONTACT_STORE', '')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+# Write-behind: requests only queue their writes; a worker thread batches them into the store
+STORE_WRITE_BEHIND = os.getenv('STORE_WRITE_BEHIND', '1') == '1'
+WRITE_QUEUE_LIMIT = int(os.getenv('WRITE_QUEUE_LIMIT', '10000'))
+# Failed writes are retried with backoff this many times, then set aside and logged
+WRITE_MAX_ATTEMPTS = int(os.getenv('WRITE_MAX_ATTEMPTS', '8'))
+# Seconds to wait for queued writes to land (reloading an evicted book, shutdown)
+WRITE_FLUSH_TIMEOUT = float(os.getenv('WRITE_FLUSH_TIMEOUT', '30'))
+STORE_CONNECTION_STRINGS = {
+    'postgres': POSTGRES_CONNECTION_STRING,
+    'mssql': MSSQL_CONNECTION_STRING,
+    'sqlite': SQLITE_CONNECTION_STRING,
+}
+
+# Shared mode: set SHARED_STATE=1 to run several worker processes against one
+# CONTACT_STORE (see gunicorn.conf.py). Writes go straight to the database and
+# are recorded in its change table; each request first applies the changes
+# other workers made. Contact IDs are reserved from the database in blocks.
+SHARED_STATE = os.getenv('SHARED_STATE', '0') == '1'
+SHARED_ID_BLOCK = int(os.getenv('SHARED_ID_BLOCK', '1000'))
+# Seconds change records are kept; a worker idle for longer reloads everything
+SHARED_CHANGE_RETENTION = float(os.getenv('SHARED_CHANGE_RETENTION', '3600'))
+
+# Operation log: set OPLOG_DIR to append every write to an fsynced log there,
+# with a snapshot every OPLOG_SNAPSHOT_EVERY records. On start the latest
+# snapshot is loaded and only the log tail after it is replayed.
+OPLOG_DIR = os.getenv('OPLOG_DIR', '')
+OPLOG_FSYNC_EVERY = int(os.getenv('OPLOG_FSYNC_EVERY', '100'))
+OPLOG_SNAPSHOT_EVERY = int(os.getenv('OPLOG_SNAPSHOT_EVERY', '100000'))
+
+# Per-user books: set PER_USER_BOOKS=1 to give every browser session its own
+# contact book (tree, indexes, VIP heap and undo history). Books load on first
+# use and are evicted when idle for BOOK_IDLE_SECONDS or beyond BOOK_CACHE_SIZE
+# loaded books, so they need CONTACT_STORE or OPLOG_DIR to reload from.
+# SECRET_KEY signs the session cookie and must match across workers.
+PER_USER_BOOKS = os.getenv('PER_USER_BOOKS', '0') == '1'
+BOOK_CACHE_SIZE = int(os.getenv('BOOK_CACHE_SIZE', '100'))
+BOOK_IDLE_SECONDS = float(os.getenv('BOOK_IDLE_SECONDS', '900'))
+
+if SHARED_STATE and (not CONTACT_STORE or OPLOG_DIR):
+    raise RuntimeError('SHARED_STATE=1 needs CONTACT_STORE and cannot be combined with OPLOG_DIR')
+if PER_USER_BOOKS and not (CONTACT_STORE or OPLOG_DIR):
+    raise RuntimeError('PER_USER_BOOKS=1 needs CONTACT_STORE or OPLOG_DIR to reload evicted books')
+if PER_USER_BOOKS and not os.getenv('SECRET_KEY'):
+    raise RuntimeError('PER_USER_BOOKS=1 needs SECRET_KEY so sessions stay valid across workers and restarts')
+
+# Maximum number of operations kept in the undo history (oldest are evicted first)
+UNDO_HISTORY_LIMIT = int(os.getenv('UNDO_HISTORY_LIMIT', '1000'))
+
+# Rows per page in the index tree view, and contacts listed per expanded category
+TREE_PAGE_SIZE = int(os.getenv('TREE_PAGE_SIZE', '50'))
+CATEGORY_PAGE_SIZE = int(os.getenv('CATEGORY_PAGE_SIZE', '25'))
+
+# Maximum search results streamed per page before offering "load more"
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '100'))
+
 
 
 app = Flask(__name__)
+app.secret_key = os.getenv('SECRET_KEY') or os.urandom(24)
 
 app.config['FLASK_TITLE'] = ""
 
 
+# Shared table of category paths: every contact filed under the same path
+# holds a reference to one interned tuple instead of its own list copy
+_category_paths = {}
+
+
+def intern_category_path(category_path):
+    """Return the shared tuple for *category_path* (any iterable of level names)."""
+    key = tuple(sys.intern(level) for level in category_path) if category_path else ()
+    return _category_paths.setdefault(key, key)
+
+
+class ContactIdCounter:
+    """Thread-safe iterator over new contact IDs.
+
+    ``advance_past`` moves the counter beyond IDs found while loading a
+    book, under the same lock as ``next``, so a book loading in one thread
+    can never hand out an ID that another book just took.
+    """
+    def __init__(self, start=1):
+        self.lock = threading.Lock()
+        self.next_id = start
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self.lock:
+            contact_id = self.next_id
+            self.next_id += 1
+            return contact_id
+
+    def advance_past(self, contact_id):
+        """Make sure every later ID is above *contact_id*."""
+        with self.lock:
+            self.next_id = max(self.next_id, contact_id + 1)
+
+
 class Contact:
-    """Represents a contact with name, category path, and priority."""
-    def __init__(self, name, category_path=None, priority=0):
+    """Represents a contact with a stable ID, name, category path, and priority.
+
+    Slotted, and the category path is an interned tuple shared by every
+    contact in that category, to keep large books small in memory.
+    """
+    __slots__ = ('id', 'name', 'category_path', 'priority', 'owner')
+
+    _next_id = ContactIdCounter()  # process-wide source of contact IDs
+
+    def __init__(self, name, category_path=None, priority=0, contact_id=None):
+        self.id = contact_id if contact_id is not None else next(Contact._next_id)
         self.name = name
-        self.category_path = category_path or []  # list like ['Work', 'Engineering', 'Team A']
+        self.category_path = intern_category_path(category_path)  # like ('Work', 'Engineering', 'Team A')
         self.priority = priority  # higher number = higher priority for VIP
+        self.owner = ''  # contact book it belongs to, set when a book attaches it
 
     def get_category_string(self):
         return ' -> '.join(self.category_path) if self.category_path else 'Uncategorized'
@@ -42,15 +174,44 @@ class Contact:
         return self.name
 
     def __repr__(self):
-        return f"Contact({self.name}, {self.category_path}, {self.priority})"
+        return f"Contact({self.id}, {self.name}, {self.category_path}, {self.priority})"
+
+
+def contact_field_error(name, category_path, priority):
+    """Return why a contact with these fields cannot be stored, or None if it can.
+
+    The limits are the contacts table's column sizes. Every route checks
+    them before touching the in-memory structures, so a write the database
+    would reject never leaves memory and the store out of step.
+    """
+    if max(len(name), len(name.lower())) > NAME_LENGTH:
+        return f"name is longer than {NAME_LENGTH} characters"
+    if len(encode_category_path(category_path)) > CATEGORY_PATH_LENGTH:
+        return f"category is longer than {CATEGORY_PATH_LENGTH} characters"
+    if not PRIORITY_MIN <= priority <= PRIORITY_MAX:
+        return f"priority must be between {PRIORITY_MIN} and {PRIORITY_MAX}"
+    return None
 
 
 class TreeNode:
-    """Node in the category tree."""
+    """Node in the category tree.
+
+    Besides its own contacts, each node keeps aggregates for its whole
+    subtree: the contact count and a count of contacts per priority (whose
+    largest key is the subtree's top priority). CategoryTree updates them
+    on every node along a contact's path, so they cost O(depth) per write
+    and O(1) to read. When asked to, a node also caches its flattened
+    subtree list; a write drops the caches along its path.
+    """
+    __slots__ = ('name', 'children', 'contacts', 'count', 'priority_counts', '_flat')
+
     def __init__(self, name):
         self.name = name
         self.children = {}  # dict of child_name -> TreeNode
         self.contacts = []  # list of Contact objects at this level
+        self.count = 0  # contacts in this subtree
+        self.priority_counts = {}  # priority -> contacts in this subtree with it
+        self._flat = None  # cached get_all_contacts(cache=True) result
 
     def add_contact(self, contact):
         """Add a contact to this node."""
@@ -62,154 +223,568 @@ class TreeNode:
             self.children[name] = TreeNode(name)
         return self.children[name]
 
-    def get_all_contacts(self):
-        """Recursively get all contacts in this subtree."""
-        all_contacts = self.contacts[:]
-        for child in self.children.values():
-            all_contacts.extend(child.get_all_contacts())
-        return all_contacts
+    def count_added(self, contact):
+        """Account for *contact* joining this subtree."""
+        self.count += 1
+        self.priority_counts[contact.priority] = self.priority_counts.get(contact.priority, 0) + 1
+        self._flat = None
+
+    def count_removed(self, contact):
+        """Account for *contact* leaving this subtree."""
+        self.count -= 1
+        remaining = self.priority_counts[contact.priority] - 1
+        if remaining:
+            self.priority_counts[contact.priority] = remaining
+        else:
+            del self.priority_counts[contact.priority]
+        self._flat = None
 
+    @property
+    def max_priority(self):
+        """Highest priority in this subtree, or None if it is empty."""
+        return max(self.priority_counts) if self.priority_counts else None
+
+    def iter_contacts(self):
+        """Lazily yield every contact in this subtree in display order.
+
+        A node's own contacts come first, then its subcategories by name.
+        Uses an explicit stack, so depth is not limited by recursion.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield from node.contacts
+            # Pushed in reverse so the first child by name is visited next
+            stack.extend(child for _, child in sorted(node.children.items(), reverse=True)
+                         if child.count)
+
+    def get_all_contacts(self, cache=False):
+        """Get all contacts in this subtree, in display order.
+
+        With *cache*, the flattened lists of this node and its descendants
+        are kept for the next call (O(contacts x depth) references in all)
+        and reused until a write below them drops them.
+        """
+        if not cache:
+            return list(self.iter_contacts())
+        if self._flat is None:
+            # Post-order walk with an explicit stack: each stale node is rebuilt
+            # after its children, reusing any child caches that are still valid
+            stack = [(self, False)]
+            while stack:
+                node, children_done = stack.pop()
+                if node._flat is not None:
+                    continue
+                if children_done:
+                    flat = node.contacts[:]
+                    for _, child in sorted(node.children.items()):
+                        if child.count:
+                            flat.extend(child._flat)
+                    node._flat = flat
+                else:
+                    stack.append((node, True))
+                    stack.extend((child, False) for child in node.children.values()
+                                 if child.count and child._flat is None)
+        return self._flat[:]
+
+
+class ContactCollection:
+    """An ordered, incrementally maintained collection of every contact in the tree.
+
+    Contacts are kept in tree display order, keyed by
+    ``(category path tuple, contact ID)``: a category's own contacts sort
+    before its subcategories and siblings sort by name, which matches a
+    pre-order walk with sorted children. Keys live in a list of small sorted
+    buckets, so an insert or removal is a bisect plus a bounded list shift
+    rather than a full tree walk. A dict from contact ID to contact doubles
+    as the registry used by the routes, so lookups by ID are O(1) and a
+    restored contact returns to its original position.
+    """
+    BUCKET_SIZE = 512
 
-class CategoryTree:
-    """Tree structure for organizing contacts by categories."""
     def __init__(self):
+        self._keys = []  # list of sorted key buckets
+        self._values = []  # Contact buckets parallel to _keys
+        self._maxes = []  # largest key in each bucket
+        self._by_id = {}  # contact ID -> Contact
+        self._len = 0
+
+    @staticmethod
+    def _key(contact):
+        return (tuple(contact.category_path), contact.id)
+
+    def add(self, contact):
+        """Insert a contact at its ordered position."""
+        if contact.id in self._by_id:
+            return
+        self._by_id[contact.id] = contact
+        key = self._key(contact)
+        self._len += 1
+        if not self._maxes:
+            self._keys.append([key])
+            self._values.append([contact])
+            self._maxes.append(key)
+            return
+        b = min(bisect.bisect_left(self._maxes, key), len(self._maxes) - 1)
+        keys = self._keys[b]
+        values = self._values[b]
+        i = bisect.bisect_left(keys, key)
+        keys.insert(i, key)
+        values.insert(i, contact)
+        self._maxes[b] = keys[-1]
+        if len(keys) > 2 * self.BUCKET_SIZE:
+            # Split oversized buckets so shifts stay bounded
+            self._keys[b:b + 1] = [keys[:self.BUCKET_SIZE], keys[self.BUCKET_SIZE:]]
+            self._values[b:b + 1] = [values[:self.BUCKET_SIZE], values[self.BUCKET_SIZE:]]
+            self._maxes[b:b + 1] = [keys[self.BUCKET_SIZE - 1], keys[-1]]
+
+    def remove(self, contact):
+        """Remove a contact. Returns False if it is not present."""
+        if self._by_id.pop(contact.id, None) is None:
+            return False
+        key = self._key(contact)
+        b = bisect.bisect_left(self._maxes, key)
+        keys = self._keys[b]
+        i = bisect.bisect_left(keys, key)
+        del keys[i]
+        del self._values[b][i]
+        if keys:
+            self._maxes[b] = keys[-1]
+        else:
+            del self._keys[b]
+            del self._values[b]
+            del self._maxes[b]
+        self._len -= 1
+        return True
+
+    def get(self, contact_id):
+        """Return the contact with *contact_id*, or None."""
+        return self._by_id.get(contact_id)
+
+    def index(self, contact):
+        """Return the position of *contact*, like ``list.index``."""
+        if contact.id not in self._by_id:
+            raise ValueError(f"{contact!r} is not in the collection")
+        key = self._key(contact)
+        b = bisect.bisect_left(self._maxes, key)
+        offset = sum(len(keys) for keys in self._keys[:b])
+        return offset + bisect.bisect_left(self._keys[b], key)
+
+    def window(self, start, count):
+        """Return up to *count* contacts starting at position *start*.
+
+        Skips whole buckets to reach *start*, so the cost is proportional to
+        the number of buckets plus the window size, not the collection size.
+        """
+        result = []
+        if count <= 0:
+            return result
+        for values in self._values:
+            if start >= len(values):
+                start -= len(values)
+                continue
+            result.extend(values[start:start + count - len(result)])
+            start = 0
+            if len(result) >= count:
+                break
+        return result
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return self.to_list()[index]
+            return self.window(start, stop - start)
+        if index < 0:
+            index += self._len
+        if index < 0 or index >= self._len:
+            raise IndexError('index out of range')
+        for values in self._values:
+            if index < len(values):
+                return values[index]
+            index -= len(values)
+
+    def __contains__(self, contact):
+        return contact.id in self._by_id
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for values in self._values:
+            yield from values
+
+    def to_list(self):
+        return list(iter(self))
+
+
+class CategoryTree:
+    """Tree structure for organizing contacts by categories.
+
+    Set *cache_lists* to keep the flattened contact list of each category
+    read through ``get_contacts_by_category``, for trees whose categories
+    are read far more often than they change.
+    """
+    def __init__(self, cache_lists=False):
         self.root = TreeNode('Root')
+        self.cache_lists = cache_lists
+        self.contacts = ContactCollection()  # ordered view of every contact, updated in place
 
     def add_contact(self, contact):
         """Add a contact to the tree based on its category path."""
         current = self.root
+        current.count_added(contact)
         for category in contact.category_path:
             current = current.get_child(category)
+            current.count_added(contact)
         current.add_contact(contact)
+        self.contacts.add(contact)
+
+    def find_node(self, category_path):
+        """Return the node for *category_path*, or None if there is no such category."""
+        current = self.root
+        for category in category_path:
+            current = current.children.get(category)
+            if current is None:
+                return None
+        return current
 
     def get_contacts_by_category(self, category_path):
         """Get contacts under a specific category path."""
-        current = self.root
-        try:
-            for category in category_path:
-                current = current.children[category]
-            return current.get_all_contacts()
-        except KeyError:
+        node = self.find_node(category_path)
+        return node.get_all_contacts(cache=self.cache_lists) if node is not None else []
+
+    def suggest(self, text, limit=10):
+        """Complete a partly typed category string, most populated paths first.
+
+        ``"Work -> Eng"`` walks to ``Work`` and completes ``Eng`` against its
+        subcategory names (case-insensitively). Matching nodes and then their
+        descendants are explored best-first from a heap keyed on subtree
+        contact count, so only about *limit* nodes are expanded however big
+        the tree is. Returns ``(category path list, count)`` pairs.
+        """
+        levels = text.split('->')
+        partial = levels.pop().strip().casefold()
+        node = self.find_node([level.strip() for level in levels])
+        if node is None or limit <= 0:
             return []
+        base = tuple(level.strip() for level in levels)
+        frontier = [(-child.count, base + (name,), child)
+                    for name, child in node.children.items()
+                    if child.count and name.casefold().startswith(partial)]
+        heapq.heapify(frontier)
+        suggestions = []
+        while frontier and len(suggestions) < limit:
+            negative_count, path, current = heapq.heappop(frontier)
+            suggestions.append((list(path), -negative_count))
+            for name, child in current.children.items():
+                if child.count:
+                    heapq.heappush(frontier, (-child.count, path + (name,), child))
+        return suggestions
+
+    def count(self, category_path=()):
+        """Number of contacts under a category path, in O(depth)."""
+        node = self.find_node(category_path)
+        return node.count if node is not None else 0
+
+    def max_priority(self, category_path=()):
+        """Highest priority under a category path, or None if it has no contacts."""
+        node = self.find_node(category_path)
+        return node.max_priority if node is not None else None
 
     def get_all_contacts(self):
-        """Get all contacts in the tree."""
-        return self.root.get_all_contacts()
+        """Get all contacts in the tree, in display order."""
+        return self.contacts.to_list()
 
     def remove_contact(self, contact):
         """Remove a contact from the tree."""
-        current = self.root
+        path = [self.root]
         for category in contact.category_path:
-            if category not in current.children:
+            if category not in path[-1].children:
                 return False
-            current = current.children[category]
+            path.append(path[-1].children[category])
+        current = path[-1]
         if contact in current.contacts:
             current.contacts.remove(contact)
+            for node in path:
+                node.count_removed(contact)
+            self.contacts.remove(contact)
             return True
         return False
 
 
 class BSTNode:
-    """Node in Binary Search Tree."""
+    """Node in the AVL-balanced Binary Search Tree."""
     def __init__(self, key, value):
         self.key = key  # category path as tuple
-        self.value = value  # list of contacts or TreeNode
+        self.value = value  # contacts keyed by id(), in insertion order
         self.left = None
         self.right = None
+        self.height = 1  # height of the subtree rooted here
 
 
 class CategoryBST:
-    """Binary Search Tree for backend category retrieval, not directly wired to the GUI."""
+    """AVL-balanced Binary Search Tree for backend category retrieval, not directly wired to the GUI.
+
+    All operations are iterative and keep the tree height-balanced, so
+    inserts, deletes and lookups stay O(log n) even when categories arrive
+    in sorted order, and deep trees never hit Python's recursion limit.
+    """
     def __init__(self):
         self.root = None
-
-    def _insert(self, node, key, contact):
-        if node is None:
-            return BSTNode(key, [contact])
-        if key < node.key:
-            node.left = self._insert(node.left, key, contact)
-        elif key > node.key:
-            node.right = self._insert(node.right, key, contact)
-        else:
-            if contact not in node.value:
-                node.value.append(contact)
+        self.size = 0  # number of category keys
+
+    @staticmethod
+    def _height(node):
+        return node.height if node else 0
+
+    def _update(self, node):
+        node.height = 1 + max(self._height(node.left), self._height(node.right))
+
+    def _rotate_right(self, node):
+        pivot = node.left
+        node.left = pivot.right
+        pivot.right = node
+        self._update(node)
+        self._update(pivot)
+        return pivot
+
+    def _rotate_left(self, node):
+        pivot = node.right
+        node.right = pivot.left
+        pivot.left = node
+        self._update(node)
+        self._update(pivot)
+        return pivot
+
+    def _balance(self, node):
+        """Restore the AVL invariant at *node* and return the subtree's new root."""
+        self._update(node)
+        balance = self._height(node.left) - self._height(node.right)
+        if balance > 1:
+            if self._height(node.left.left) < self._height(node.left.right):
+                node.left = self._rotate_left(node.left)
+            return self._rotate_right(node)
+        if balance < -1:
+            if self._height(node.right.right) < self._height(node.right.left):
+                node.right = self._rotate_right(node.right)
+            return self._rotate_left(node)
         return node
 
+    def _rebalance_path(self, path):
+        """Rebalance every node on a root-to-leaf *path*, bottom up."""
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            subtree = self._balance(node)
+            if subtree is node:
+                continue
+            if i == 0:
+                self.root = subtree
+            elif path[i - 1].left is node:
+                path[i - 1].left = subtree
+            else:
+                path[i - 1].right = subtree
+
+    def _descend(self, key):
+        """Return ``(path, node)`` for *key*; *node* is None when it is absent."""
+        path = []
+        node = self.root
+        while node is not None and node.key != key:
+            path.append(node)
+            node = node.left if key < node.key else node.right
+        return path, node
+
     def insert(self, key, contact):
         """Insert a contact into the BST category index."""
-        self.root = self._insert(self.root, key, contact)
+        self.insert_many(key, (contact,))
 
-    def _search(self, node, key):
-        if node is None or node.key == key:
-            return node
-        if key < node.key:
-            return self._search(node.left, key)
-        return self._search(node.right, key)
+    def insert_many(self, key, contacts):
+        """Insert several contacts under one category key with a single descent."""
+        path, node = self._descend(key)
+        if node is None:
+            node = BSTNode(key, {})
+            self.size += 1
+            if not path:
+                self.root = node
+            elif key < path[-1].key:
+                path[-1].left = node
+            else:
+                path[-1].right = node
+            self._rebalance_path(path)
+        members = node.value
+        for contact in contacts:
+            members.setdefault(id(contact), contact)
+
+    def _search(self, key):
+        return self._descend(key)[1]
 
     def search(self, key):
         """Search for a category and return matching contacts."""
-        node = self._search(self.root, key)
-        return node.value if node else []
+        node = self._search(key)
+        return list(node.value.values()) if node else []
 
-    def _find_min(self, node):
-        while node.left:
-            node = node.left
-        return node
+    def remove(self, key, contact):
+        """Remove a contact from a category in the BST."""
+        self.remove_many(key, (contact,))
 
-    def _delete(self, node, key, contact):
+    def remove_many(self, key, contacts):
+        """Remove several contacts from one category with a single descent."""
+        path, node = self._descend(key)
         if node is None:
-            return None
-        if key < node.key:
-            node.left = self._delete(node.left, key, contact)
-        elif key > node.key:
-            node.right = self._delete(node.right, key, contact)
-        else:
-            if contact in node.value:
-                node.value.remove(contact)
-            if node.value:
-                return node
-            if node.left is None:
-                return node.right
-            if node.right is None:
-                return node.left
-            successor = self._find_min(node.right)
+            return
+        members = node.value
+        for contact in contacts:
+            members.pop(id(contact), None)
+        if members:
+            return
+
+        # The category is empty: unlink its node
+        self.size -= 1
+        if node.left and node.right:
+            # Move the in-order successor's entry here, then unlink the successor
+            path.append(node)
+            successor = node.right
+            while successor.left:
+                path.append(successor)
+                successor = successor.left
             node.key = successor.key
-            node.value = successor.value.copy()
-            node.right = self._delete(node.right, successor.key, successor.value[0])
-        return node
+            node.value = successor.value
+            node, replacement = successor, successor.right
+        else:
+            replacement = node.left or node.right
+        if not path:
+            self.root = replacement
+        elif path[-1].left is node:
+            path[-1].left = replacement
+        else:
+            path[-1].right = replacement
+        self._rebalance_path(path)
 
-    def remove(self, key, contact):
-        """Remove a contact from a category in the BST."""
-        self.root = self._delete(self.root, key, contact)
+    def range_items(self, low, high=None):
+        """Yield ``(key, contacts)`` for keys with ``low <= key < high`` in sorted order.
 
-    def get_all_categories(self):
-        """Get all category keys in sorted order."""
+        Leaving *high* as None yields everything from *low* onwards.
+        """
+        stack = []
+        node = self.root
+        while node:
+            if node.key < low:
+                node = node.right
+            else:
+                stack.append(node)
+                node = node.left
+        while stack:
+            node = stack.pop()
+            if high is not None and node.key >= high:
+                return
+            yield node.key, node.value.values()
+            node = node.right
+            while node:
+                stack.append(node)
+                node = node.left
+
+    def prefix_items(self, prefix):
+        """Yield ``(key, contacts)`` for every category key starting with *prefix*.
+
+        Keys sharing a prefix are contiguous in tuple order, so the walk
+        starts at *prefix* itself and stops at the first key outside it.
+        """
+        prefix = tuple(prefix)
+        width = len(prefix)
+        for key, value in self.range_items(prefix):
+            if key[:width] != prefix:
+                return
+            yield key, value
+
+    def search_prefix(self, prefix):
+        """Return all contacts in categories under *prefix*, e.g. ``('Work',)``."""
         result = []
-        self._inorder(self.root, result)
+        for _, value in self.prefix_items(prefix):
+            result.extend(value)
         return result
 
-    def _inorder(self, node, result):
-        if node:
-            self._inorder(node.left, result)
-            result.append(node.key)
-            self._inorder(node.right, result)
+    def get_all_categories(self):
+        """Get all category keys in sorted order."""
+        return [key for key, _ in self.range_items(())]
 
 
 class PriorityQueue:
-    """Priority Queue using heapq for VIP contacts."""
+    """Indexed max-heap of VIP contacts.
+
+    The heap holds ``(-priority, entry_count, contact)`` entries and a
+    position map from contact ID to heap slot, so a single entry can be
+    removed or re-prioritised by sifting it in O(log n) instead of
+    rebuilding the whole heap.
+    """
     def __init__(self):
-        self.heap = []  # list of (-priority, contact) for max-heap
+        self.heap = []  # list of (-priority, entry_count, contact) for max-heap
+        self.positions = {}  # contact ID -> index of its entry in heap
         self.entry_count = 0  # to handle duplicate priorities
 
+    def _place(self, index, entry):
+        self.heap[index] = entry
+        self.positions[entry[2].id] = index
+
+    def _sift_up(self, index):
+        entry = self.heap[index]
+        while index > 0:
+            parent = (index - 1) // 2
+            if self.heap[parent] <= entry:
+                break
+            self._place(index, self.heap[parent])
+            index = parent
+        self._place(index, entry)
+
+    def _sift_down(self, index):
+        entry = self.heap[index]
+        size = len(self.heap)
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and self.heap[child + 1] < self.heap[child]:
+                child += 1
+            if entry <= self.heap[child]:
+                break
+            self._place(index, self.heap[child])
+            index = child
+        self._place(index, entry)
+
+    def _remove_at(self, index):
+        entry = self.heap[index]
+        del self.positions[entry[2].id]
+        last = self.heap.pop()
+        if index < len(self.heap):
+            self._place(index, last)
+            self._sift_up(index)
+            self._sift_down(self.positions[last[2].id])
+        return entry[2]
+
     def push(self, contact):
-        """Add contact to priority queue."""
-        heapq.heappush(self.heap, (-contact.priority, self.entry_count, contact))
+        """Add contact to priority queue, or reposition it if already queued."""
+        if contact.id in self.positions:
+            self.update_priority(contact)
+            return
+        self.heap.append((-contact.priority, self.entry_count, contact))
         self.entry_count += 1
+        self._sift_up(len(self.heap) - 1)
+
+    def push_many(self, contacts):
+        """Add a batch of contacts, restoring the heap once with a bottom-up heapify."""
+        for contact in contacts:
+            if contact.id in self.positions:
+                self.update_priority(contact)
+                continue
+            self.positions[contact.id] = len(self.heap)
+            self.heap.append((-contact.priority, self.entry_count, contact))
+            self.entry_count += 1
+        for index in range(len(self.heap) // 2 - 1, -1, -1):
+            self._sift_down(index)
 
     def pop(self):
         """Remove and return highest priority contact."""
         if self.heap:
-            return heapq.heappop(self.heap)[2]
+            return self._remove_at(0)
         return None
 
     def peek(self):
@@ -224,35 +799,75 @@ class PriorityQueue:
     def size(self):
         return len(self.heap)
 
+    def __contains__(self, contact):
+        return contact.id in self.positions
+
     def get_top_contacts(self, n=5):
-        """Get top n contacts without removing them."""
-        # Create a sorted list from heap
-        sorted_contacts = sorted(self.heap, key=lambda x: x[0])  # sort by priority (already negative)
-        return [contact for _, _, contact in sorted_contacts[:n]]
+        """Get top n contacts without removing them.
 
-    def remove(self, contact):
-        """Remove a contact from the priority queue."""
-        self.heap = [item for item in self.heap if item[2] != contact]
-        heapq.heapify(self.heap)
+        Explores the heap best-first from the root with a small frontier
+        heap, touching O(n) entries in O(n log n) time regardless of the
+        total queue size.
+        """
+        result = []
+        if not self.heap or n <= 0:
+            return result
+        frontier = [(self.heap[0], 0)]
+        while frontier and len(result) < n:
+            entry, index = heapq.heappop(frontier)
+            result.append(entry[2])
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(self.heap):
+                    heapq.heappush(frontier, (self.heap[child], child))
+        return result
 
     def remove(self, contact):
-        """Remove a contact from the priority queue."""
-        self.heap = [item for item in self.heap if item[2] != contact]
-        heapq.heapify(self.heap)
+        """Remove a contact from the priority queue in O(log n)."""
+        index = self.positions.get(contact.id)
+        if index is not None:
+            self._remove_at(index)
 
-    def remove(self, contact):
-        """Remove a contact from the priority queue."""
-        self.heap = [item for item in self.heap if item[2] != contact]
-        heapq.heapify(self.heap)
+    def update_priority(self, contact):
+        """Reposition a contact after its priority changed, keeping VIP membership (priority > 0) in sync.
+
+        The queue never changes ``contact.priority`` itself: the category
+        tree, BST and columns also depend on it, so a contact book changes a
+        priority by detaching the contact, updating it and attaching it again.
+        """
+        priority = contact.priority
+        index = self.positions.get(contact.id)
+        if index is None:
+            if priority > 0:
+                self.push(contact)
+            return
+        if priority <= 0:
+            self._remove_at(index)
+            return
+        _, count, _ = self.heap[index]
+        self.heap[index] = (-priority, count, contact)
+        self._sift_up(index)
+        self._sift_down(self.positions[contact.id])
 
 
 class Stack:
-    """A stack data structure (LIFO) for storing undo operations."""
-    def __init__(self):
-        self.items = []
+    """A stack data structure (LIFO) for storing undo operations.
+
+    Backed by a deque. When *max_size* is set, pushing onto a full stack
+    evicts the oldest item from the bottom so history stays bounded.
+    """
+    def __init__(self, max_size=None):
+        self.items = deque()
+        self.max_size = max_size
+        self.evicted = 0  # number of items dropped to respect max_size
 
     def push(self, item):
         """Add an item to the top of the stack."""
+        if self.max_size is not None and len(self.items) >= self.max_size:
+            if self.max_size <= 0:
+                self.evicted += 1
+                return
+            self.items.popleft()
+            self.evicted += 1
         self.items.append(item)
 
     def pop(self):
@@ -277,18 +892,30 @@ class Stack:
 
 
 class Queue:
-    """A queue data structure (FIFO) for storing redo operations."""
-    def __init__(self):
-        self.items = []
+    """A queue data structure (FIFO) for storing redo operations.
+
+    Backed by a deque so both ends are O(1). When *max_size* is set,
+    enqueueing onto a full queue evicts the front (oldest) item.
+    """
+    def __init__(self, max_size=None):
+        self.items = deque()
+        self.max_size = max_size
+        self.evicted = 0  # number of items dropped to respect max_size
 
     def enqueue(self, item):
         """Add an item to the back of the queue."""
+        if self.max_size is not None and len(self.items) >= self.max_size:
+            if self.max_size <= 0:
+                self.evicted += 1
+                return
+            self.items.popleft()
+            self.evicted += 1
         self.items.append(item)
 
     def dequeue(self):
         """Remove and return the front item from the queue."""
         if not self.is_empty():
-            return self.items.pop(0)
+            return self.items.popleft()
         return None
 
     def peek(self):
@@ -307,16 +934,154 @@ class Queue:
 
     def clear(self):
         """Clear all items from the queue."""
-        self.items = []
+        self.items.clear()
+
+
+class ReadWriteLock:
+    """Lets many readers hold the lock at once, or a single writer alone.
+
+    Writers are preferred: once a writer is waiting, new readers queue
+    behind it, so a steady stream of page views and searches cannot starve
+    adds and deletes. The lock is not reentrant.
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.writers_waiting = 0
+
+    @contextmanager
+    def read_locked(self):
+        with self.condition:
+            while self.writer or self.writers_waiting:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def write_locked(self):
+        with self.condition:
+            self.writers_waiting += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.writers_waiting -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer = False
+                self.condition.notify_all()
+
+
+class SharedIdAllocator:
+    """Iterator over contact IDs reserved from the shared store in blocks.
+
+    Installed as ``Contact._next_id`` in shared mode so worker processes
+    never hand out the same ID. Safe to call from several threads.
+    """
+    def __init__(self, store, block_size=1000):
+        self.store = store
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.end = 0  # first ID past the current block
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self.lock:
+            if self.next_id >= self.end:
+                self.next_id = self.store.reserve_ids(self.block_size)
+                self.end = self.next_id + self.block_size
+            contact_id = self.next_id
+            self.next_id += 1
+            return contact_id
+
+
+class ChangeFollower:
+    """Applies contact changes that other processes recorded in the shared store.
+
+    ``poll`` checks the newest change sequence number (one cheap query) and,
+    when it moved, hands each new change to *apply_change*, which takes
+    care of locking the affected book. Sequence numbers are assigned at
+    insert but become visible at commit, so a gap below the newest change
+    may still fill in; gaps are re-queried until they appear or GAP_TIMEOUT
+    passes (a rolled-back write leaves a permanent gap). If changes this
+    process never saw were already pruned, *reload_all* rebuilds every
+    loaded book from the store instead. Pruning always keeps the newest
+    change, so it still shows how far behind this process is; a newest
+    change below the one already applied means the table was reset, which
+    also triggers a reload.
+    """
+    GAP_TIMEOUT = 30.0
+
+    def __init__(self, store, apply_change, reload_all, retention=3600.0):
+        self.store = store
+        self.apply_change = apply_change
+        self.reload_all = reload_all
+        self.retention = retention
+        self.poll_lock = threading.Lock()
+        self.applied_seq = 0
+        self.gaps = {}  # missing seq -> time first noticed
+        self.last_prune = 0.0
+
+    def start(self):
+        """Mark the current end of the change table; call before the initial load."""
+        self.applied_seq = self.store.latest_change()
+
+    def poll(self):
+        """Apply any new changes. Returns the number applied."""
+        with self.poll_lock:
+            self._prune()
+            latest = self.store.latest_change()
+            if latest == self.applied_seq and not self.gaps:
+                return 0
+            if latest < self.applied_seq or self.store.oldest_change() > self.applied_seq + 1:
+                self.start()
+                self.reload_all()
+                self.gaps.clear()
+                return 0
+
+            changes = self.store.changes_since(self.applied_seq, self.gaps,
+                                               skip_origin=self.store.origin)
+            now = time.time()
+            applied = 0
+            for seq, op, owner, contact_id, row in changes:
+                self.gaps.pop(seq, None)
+                if seq > self.applied_seq:
+                    for missing in range(self.applied_seq + 1, seq):
+                        self.gaps[missing] = now
+                    self.applied_seq = seq
+                if op is not None:
+                    self.apply_change(owner, op, contact_id, row)
+                    applied += 1
+            for missing, noticed in list(self.gaps.items()):
+                if now - noticed > self.GAP_TIMEOUT:
+                    del self.gaps[missing]
+            return applied
+
+    def _prune(self):
+        now = time.time()
+        if now - self.last_prune >= self.retention / 10:
+            self.last_prune = now
+            self.store.prune_changes(now - self.retention)
 
 
 class ContactHashTable:
     """A hash table (dictionary-based) for O(1) contact lookup by name.
 
     NOTE: this structure remains in the codebase for demonstration purposes
-    but the search endpoint has been updated to rely on quick sort and a
-    simple linear scan instead of O(1) hashing.  It is no longer used by
-    the search route itself.
+    but the search endpoint relies on the ``SubstringIndex`` below instead,
+    since exact-name hashing cannot answer substring queries.  It is no
+    longer used by the search route itself.
     """
     def __init__(self):
         self.table = {}  # key: lowercase name, value: list of positions/names
@@ -348,21 +1113,175 @@ class ContactHashTable:
         self.table = {}
 
 
+class SubstringIndex:
+    """A trigram index for case-insensitive substring search over contact names.
+
+    Every lowercase name is split into its 3-character grams, and each gram
+    maps to a compact ``array`` of the IDs of contacts whose name contains
+    it (8 bytes per posting rather than a set entry per contact and gram).
+    Queries of three or more characters intersect the postings of their
+    trigrams (smallest first) and only verify the surviving candidates.
+    Shorter queries union the postings of every trigram containing them,
+    plus the few names under three characters, so a search never scans
+    every contact.
+    """
+    GRAM_SIZE = 3
+
+    def __init__(self):
+        self.postings = {}  # trigram -> array of contact IDs
+        self.contacts = {}  # contact ID -> Contact
+        self.short = set()  # IDs of contacts whose name is shorter than a trigram
+
+    def _grams(self, text):
+        """Return the set of trigrams in *text*."""
+        return {text[i:i + self.GRAM_SIZE] for i in range(len(text) - self.GRAM_SIZE + 1)}
+
+    @staticmethod
+    def key_of(contact):
+        """Return the ``(lowercase name, contact ID)`` sort key of a contact."""
+        return (contact.name.lower(), contact.id)
+
+    def add(self, contact):
+        """Index a contact's name."""
+        if contact.id in self.contacts:
+            return
+        self.contacts[contact.id] = contact
+        name = contact.name.lower()
+        if len(name) < self.GRAM_SIZE:
+            self.short.add(contact.id)
+        for gram in self._grams(name):
+            bucket = self.postings.get(gram)
+            if bucket is None:
+                bucket = self.postings[gram] = array('q')
+            bucket.append(contact.id)
+
+    def remove(self, contact):
+        """Drop a contact from the index."""
+        if self.contacts.pop(contact.id, None) is None:
+            return
+        self.short.discard(contact.id)
+        for gram in self._grams(contact.name.lower()):
+            bucket = self.postings[gram]
+            bucket.remove(contact.id)
+            if not bucket:
+                del self.postings[gram]
+
+    def matches(self, query):
+        """Return the contacts whose name contains *query*, in no particular order."""
+        query = query.lower()
+        if not query:
+            return []
+        contacts = self.contacts
+        if len(query) < self.GRAM_SIZE:
+            ids = {contact_id for contact_id in self.short if query in contacts[contact_id].name.lower()}
+            for gram, bucket in self.postings.items():
+                if query in gram:
+                    ids.update(bucket)
+            return [contacts[contact_id] for contact_id in ids]
+        buckets = []
+        for gram in self._grams(query):
+            bucket = self.postings.get(gram)
+            if not bucket:
+                return []
+            buckets.append(bucket)
+        buckets.sort(key=len)
+        candidates = set(buckets[0])
+        for bucket in buckets[1:]:
+            candidates.intersection_update(bucket)
+            if not candidates:
+                return []
+        # Trigram hits are necessary but not sufficient; confirm the full substring
+        matched = [contacts[contact_id] for contact_id in candidates]
+        if len(query) == self.GRAM_SIZE:
+            return matched  # the query is the trigram itself
+        return [contact for contact in matched if query in contact.name.lower()]
+
+    def iter_ordered(self, contacts, after=None):
+        """Lazily yield *contacts* in name order, starting after the sort key *after*.
+
+        The contacts are heapified in O(h) and popped one at a time, so
+        taking the first k results costs O(h + k log h) instead of a full sort.
+        """
+        heap = [self.key_of(c) + (c,) for c in contacts]
+        if after is not None:
+            heap = [entry for entry in heap if entry[:2] > after]
+        heapq.heapify(heap)
+        while heap:
+            yield heapq.heappop(heap)[2]
+
+    def search(self, query):
+        """Return contacts whose name contains *query*, ordered by name."""
+        return merge_sort(self.matches(query), key=self.key_of)
+
+    def __len__(self):
+        return len(self.contacts)
+
+
+class SearchResultStream:
+    """One page of ordered search results, produced lazily while the template renders.
+
+    Iterating yields at most *limit* contacts. Once iteration finishes,
+    ``next_token`` holds the continuation token for the following page, or
+    None when there are no more results or the page was empty (a zero
+    *limit*), since there is no last row to continue after.
+    """
+    def __init__(self, ordered, limit, key_of):
+        self.ordered = ordered
+        self.limit = limit
+        self.key_of = key_of
+        self.last_key = None
+        self.has_more = False
+
+    def __iter__(self):
+        for count, contact in enumerate(self.ordered):
+            if count == self.limit:
+                self.has_more = True
+                return
+            self.last_key = self.key_of(contact)
+            yield contact
+
+    @property
+    def next_token(self):
+        if not self.has_more or self.last_key is None:
+            return None
+        return encode_search_token(self.last_key)
+
+
+def encode_search_token(sort_key):
+    """Encode a search sort key as an opaque, URL-safe continuation token."""
+    return base64.urlsafe_b64encode(json.dumps(sort_key).encode('utf-8')).decode('ascii')
+
+
+def decode_search_token(token):
+    """Decode a continuation token back into a sort key, or None if it is invalid."""
+    if not token:
+        return None
+    try:
+        name, contact_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return (str(name), int(contact_id))
+    except (ValueError, TypeError):
+        return None
+
+
 class ContactOperation:
-    """Represents an operation (add or delete) for undo/redo tracking."""
-    def __init__(self, operation_type, contact):
+    """Represents an operation (add, delete or import) for undo/redo tracking."""
+    def __init__(self, operation_type, contact=None, contacts=None):
         """
-        operation_type: 'add' or 'delete'
-        contact: Contact object
+        operation_type: 'add', 'delete' or 'import'
+        contact: Contact object (add/delete)
+        contacts: list of Contact objects added together (import)
         """
         self.operation_type = operation_type
         self.contact = contact
+        self.contacts = contacts or []
         self.timestamp = time.time()
 
 
 class LinkedList:
     """A minimal singly-linked list with list-like API used for the demo.
-    Supports: append, insert, pop, __len__, __iter__, __getitem__.
+    Supports: append, extend, insert, pop, __len__, __iter__, __getitem__
+    (including slices). A tail pointer makes append O(1), and slices are read
+    with a single forward walk.
     This preserves the original behavior but stores contacts in a linked list.
     """
     class _Node:
@@ -373,22 +1292,41 @@ class LinkedList:
 
     def __init__(self, iterable=None):
         self.head = None
+        self.tail = None
         self._len = 0
         if iterable:
-            for v in iterable:
-                self.append(v)
+            self.extend(iterable)
 
     def append(self, value):
         node = LinkedList._Node(value)
         if not self.head:
             self.head = node
         else:
-            cur = self.head
-            while cur.next:
-                cur = cur.next
-            cur.next = node
+            self.tail.next = node
+        self.tail = node
         self._len += 1
 
+    def extend(self, iterable):
+        """Append every value from *iterable*, linking the batch in one pass."""
+        first = last = None
+        count = 0
+        for value in iterable:
+            node = LinkedList._Node(value)
+            if first is None:
+                first = node
+            else:
+                last.next = node
+            last = node
+            count += 1
+        if first is None:
+            return
+        if self.head is None:
+            self.head = first
+        else:
+            self.tail.next = first
+        self.tail = last
+        self._len += count
+
     def __len__(self):
         return self._len
 
@@ -404,23 +1342,32 @@ class LinkedList:
             index += self._len
         if index < 0 or index >= self._len:
             raise IndexError('index out of range')
+        if index == self._len - 1:
+            return self.tail
         cur = self.head
         for _ in range(index):
             cur = cur.next
         return cur
 
     def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step < 0:
+                return self.to_list()[index]
+            return list(itertools.islice(self, start, stop, step))
         return self._node_at(index).value
 
     def insert(self, index, value):
         # insert at bounds: <=0 -> head, >=len -> append
+        if index >= self._len:
+            self.append(value)
+            return
         if index <= 0:
             self.head = LinkedList._Node(value, self.head)
+            if self.tail is None:
+                self.tail = self.head
             self._len += 1
             return
-        if index >= self._len:
-            self.append(value)
-            return
         prev = self._node_at(index - 1)
         prev.next = LinkedList._Node(value, prev.next)
         self._len += 1
@@ -435,11 +1382,15 @@ class LinkedList:
         if index == 0:
             val = self.head.value
             self.head = self.head.next
+            if self.head is None:
+                self.tail = None
             self._len -= 1
             return val
         prev = self._node_at(index - 1)
         val = prev.next.value
         prev.next = prev.next.next
+        if prev.next is None:
+            self.tail = prev
         self._len -= 1
         return val
 
@@ -447,66 +1398,545 @@ class LinkedList:
         return list(iter(self))
 
 
-def quick_sort(arr, key=lambda x: x):
-    """Return a new list that is a quick-sorted version of *arr*.
-
-    The `key` function is applied to each element for comparisons (similar to
-    the built-in ``sorted``).  This implementation is recursive and uses the
-    pivot-at-middle strategy. It produces a new list, leaving *arr* unmodified.
-    """
-    if len(arr) <= 1:
-        return arr[:]
-    pivot = arr[len(arr) // 2]
-    pivot_key = key(pivot)
-    left = [x for x in arr if key(x) < pivot_key]
-    middle = [x for x in arr if key(x) == pivot_key]
-    right = [x for x in arr if key(x) > pivot_key]
-    return quick_sort(left, key) + middle + quick_sort(right, key)
-
-
-def find_contact_by_id(contact_id, sorted_contacts):
-    """Perform binary search to find a contact by ID (index) in a sorted list.
+def find_contact_by_id(contact_id, sorted_contacts=None):
+    """Perform binary search to find a contact by name in a sorted name index.
     
     Args:
         contact_id: The contact name to search for (performs case-insensitive comparison).
-        sorted_contacts: A sorted list of contact names.
+        sorted_contacts: A SortedNameIndex, or a list of contact names.
+            Defaults to the app's index of all contacts.
     
     Returns:
-        A tuple (index, contact_name) if found, otherwise None.
-        The index refers to the position in the sorted list.
+        A tuple (index, item) if found, otherwise None.
+        The index refers to the position in the sorted index.
     
-    Time Complexity: O(log n) where n is the number of contacts.
-    Space Complexity: O(1)
+    Time Complexity: O(log n) where n is the number of contacts, since the
+    index stores pre-casefolded keys. Passing a plain list costs an O(n log n)
+    index build first, so keep a SortedNameIndex for repeated lookups.
+    Space Complexity: O(1) with an index.
+    """
+    if sorted_contacts is None:
+        sorted_contacts = contact_name_index
+    elif not isinstance(sorted_contacts, SortedNameIndex):
+        sorted_contacts = SortedNameIndex(sorted_contacts)
+    return sorted_contacts.find(contact_id)
+
+
+def parse_category_path(category_str):
+    """Split a category string like "Work -> Engineering" into its levels."""
+    return [cat.strip() for cat in category_str.split('->')] if category_str else []
+
+
+def category_levels(category):
+    """Return the levels of a category given as an "A -> B" string or a list of strings.
+
+    List levels are stripped like parsed ones; None is returned for any
+    other type, a non-string level, or a level containing "->".
     """
-    if not sorted_contacts:
+    if category is None:
+        return []
+    if isinstance(category, str):
+        return parse_category_path(category)
+    if not isinstance(category, list) or not all(isinstance(level, str) for level in category):
         return None
-    
-    left = 0
-    right = len(sorted_contacts) - 1
-    contact_id_lower = contact_id.strip().lower()
-    
-    while left <= right:
-        mid = (left + right) // 2
-        mid_contact = sorted_contacts[mid]
-        mid_contact_lower = mid_contact.lower()
-        
-        # Compare case-insensitively
-        if mid_contact_lower == contact_id_lower:
-            return (mid, mid_contact)
-        elif mid_contact_lower < contact_id_lower:
-            left = mid + 1
-        else:
-            right = mid - 1
-    
-    # Contact not found
-    return None
+    levels = [level.strip() for level in category]
+    if any('->' in level for level in levels):
+        return None
+    return levels
+
+
+def _json_records(stream):
+    """Yield the parsed records of a JSON Lines stream, or None for a line that is not valid JSON."""
+    for line in stream:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def parse_contact_rows(stream, fmt, rejected=None):
+    """Yield Contacts parsed lazily from a CSV or JSON Lines text stream.
+
+    CSV input needs a header row with a ``name`` column and may have
+    ``category`` (levels separated by "->") and ``priority`` columns.
+    JSON Lines records use the same keys, and ``category`` may also be a
+    list of levels. Rows that are not an object, lack a text name, have a
+    malformed category or a non-integer priority, or do not fit the store's
+    columns are skipped; their row numbers (counting from 1) are appended
+    to *rejected* if given.
+    """
+    if fmt == 'csv':
+        records = csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        records = _json_records(stream)
+    else:
+        raise ValueError(f"Unsupported import format: {fmt!r}")
+
+    for row_number, record in enumerate(records, 1):
+        contact = None
+        if isinstance(record, dict) and isinstance(record.get('name') or '', str):
+            contact = contact_from_record(record)
+        if contact is None:
+            if rejected is not None:
+                rejected.append(row_number)
+            continue
+        yield contact
+
+
+def contact_from_record(record):
+    """Build a Contact from an import record, or return None if it is not usable."""
+    name = (record.get('name') or '').strip()
+    if not name:
+        return None
+    category = category_levels(record.get('category'))
+    if category is None:
+        return None
+    try:
+        priority = int(record.get('priority') or 0)
+    except (TypeError, ValueError):
+        return None
+    if contact_field_error(name, category, priority):
+        return None
+    return Contact(name, category, priority)
+
+
+def import_format_for(filename):
+    """Guess the import format from a file name's extension."""
+    if filename.lower().endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'csv'
+
+
+contact_store = None
+contact_store_is_new = False
+contact_writer = None  # the store itself, or a WriteBehindQueue in front of it
+if CONTACT_STORE:
+    contact_store = create_store(CONTACT_STORE, STORE_CONNECTION_STRINGS.get(CONTACT_STORE),
+                                 pool_size=DB_POOL_SIZE, track_changes=SHARED_STATE,
+                                 origin=f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}")
+    contact_store_is_new = contact_store.create_schema()
+    contact_writer = contact_store
+    # Shared mode writes through, so other workers see a change once the request returns
+    if STORE_WRITE_BEHIND and not SHARED_STATE:
+        contact_writer = WriteBehindQueue(contact_store, max_pending=WRITE_QUEUE_LIMIT,
+                                          max_attempts=WRITE_MAX_ATTEMPTS)
+        # Flush queued writes before the process exits
+        atexit.register(contact_writer.close, WRITE_FLUSH_TIMEOUT)
+
+
+class ContactBook:
+    """One owner's contacts with every structure the app keeps for them.
+
+    Holds the category tree, BST, VIP heap, name indexes and undo/redo
+    history, plus a ReadWriteLock guarding all of them: read-only routes
+    take it shared; anything that adds, deletes, undoes or redoes takes it
+    exclusively, so readers never see a half-applied change. Separate books
+    never contend with each other. Writes are mirrored to the book's
+    operation log and to the shared store, if configured.
+    """
+    def __init__(self, owner='', store=None, writer=None, log_dir=None):
+        self.owner = owner
+        self.category_tree = CategoryTree()
+        self.category_bst = CategoryBST()
+        self.vip_queue = PriorityQueue()
+        self.name_search_index = SubstringIndex()
+        self.contact_name_index = SortedNameIndex(key=lambda contact: contact.name)
+        # Columnar copy for filtered, sorted and top-k queries
+        self.columns = ContactColumns()
+        # The tree keeps its ordered view of all contacts up to date in place
+        self.contacts = self.category_tree.contacts
+        self.undo_stack = Stack(max_size=UNDO_HISTORY_LIMIT)
+        self.redo_queue = Queue(max_size=UNDO_HISTORY_LIMIT)
+        self.lock = ReadWriteLock()
+        self.store = store
+        self.writer = writer
+        self.operation_log = None
+        if log_dir:
+            self.operation_log = OperationLog(log_dir, snapshot_source=self.contacts.to_list,
+                                              fsync_every=OPLOG_FSYNC_EVERY,
+                                              snapshot_every=OPLOG_SNAPSHOT_EVERY)
+        self.loaded = False
+        self.users = 0  # requests currently using the book; it is never evicted while busy
+        self.last_used = time.monotonic()
+
+    def persist_saved(self, batch):
+        """Record added or restored contacts in the operation log and persistent store, if configured."""
+        if not batch:
+            return
+        if self.operation_log is not None:
+            self.operation_log.save_many(batch)
+        if self.writer is not None:
+            self.writer.save_many(batch)
+
+    def persist_deleted(self, batch):
+        """Record deleted contacts in the operation log and persistent store, if configured."""
+        if not batch:
+            return
+        contact_ids = [contact.id for contact in batch]
+        if self.operation_log is not None:
+            self.operation_log.delete_many(contact_ids)
+        if self.writer is not None:
+            self.writer.delete_many(contact_ids, self.owner)
+
+    def attach_contact(self, contact, persist=True):
+        """Add a contact to the tree, BST, VIP queue and name indexes (and the store)."""
+        # Reject a contact the columns cannot hold before any structure changes
+        self.columns.check(contact)
+        if contact in self.contacts:
+            raise ValueError(f"Contact ID {contact.id} is already loaded")
+        contact.owner = self.owner
+        self.category_tree.add_contact(contact)
+        self.category_bst.insert(tuple(contact.category_path), contact)
+        if contact.priority > 0:
+            self.vip_queue.push(contact)
+        self.name_search_index.add(contact)
+        self.contact_name_index.add(contact)
+        self.columns.add(contact)
+        if persist:
+            self.persist_saved([contact])
+
+    def detach_contact(self, contact, persist=True):
+        """Remove a contact from the tree, BST, VIP queue and name indexes (and the store)."""
+        self.category_tree.remove_contact(contact)
+        self.category_bst.remove(tuple(contact.category_path), contact)
+        if contact.priority > 0:
+            self.vip_queue.remove(contact)
+        self.name_search_index.remove(contact)
+        self.contact_name_index.remove(contact)
+        self.columns.remove(contact.id)
+        if persist:
+            self.persist_deleted([contact])
+
+    def attach_contacts(self, batch, persist=True):
+        """Add many contacts at once.
+
+        BST categories are filled group by group, and the VIP heap and sorted
+        name index are rebuilt a single time at the end of the batch. The store
+        receives the batch as batched writes.
+        """
+        seen = set()
+        for contact in batch:
+            self.columns.check(contact)
+            # The tree and indexes would keep a second copy that the ordered
+            # collection silently drops, so duplicates are refused up front
+            if contact.id in seen or contact in self.contacts:
+                raise ValueError(f"Contact ID {contact.id} is already loaded")
+            seen.add(contact.id)
+        by_category = {}
+        for contact in batch:
+            contact.owner = self.owner
+            self.category_tree.add_contact(contact)
+            self.name_search_index.add(contact)
+            by_category.setdefault(tuple(contact.category_path), []).append(contact)
+        for key, group in by_category.items():
+            self.category_bst.insert_many(key, group)
+        self.vip_queue.push_many(contact for contact in batch if contact.priority > 0)
+        self.contact_name_index.add_many(batch)
+        self.columns.add_many(batch)
+        if persist:
+            self.persist_saved(batch)
+
+    def detach_contacts(self, batch, persist=True):
+        """Remove many contacts at once, category by category in the BST."""
+        by_category = {}
+        for contact in batch:
+            self.category_tree.remove_contact(contact)
+            if contact.priority > 0:
+                self.vip_queue.remove(contact)
+            self.name_search_index.remove(contact)
+            by_category.setdefault(tuple(contact.category_path), []).append(contact)
+        for key, group in by_category.items():
+            self.category_bst.remove_many(key, group)
+        self.contact_name_index.remove_many(batch)
+        self.columns.remove_many(contact.id for contact in batch)
+        if persist:
+            self.persist_deleted(batch)
+
+    def bulk_import(self, stream, fmt, rejected=None):
+        """Load every contact from *stream* as one batch and record it as a single undoable operation.
+
+        Returns the list of imported contacts. Row numbers of skipped rows
+        are appended to *rejected* if given.
+        """
+        batch = list(parse_contact_rows(stream, fmt, rejected))
+        if batch:
+            # Parse outside the lock; only the insert excludes readers
+            with self.lock.write_locked():
+                self.attach_contacts(batch)
+                self.undo_stack.push(ContactOperation('import', contacts=batch))
+                self.redo_queue.clear()
+        return batch
+
+    def record_add(self, contact):
+        """Add a contact and record the operation in the undo stack."""
+        # Add to tree, BST category index, VIP queue and name indexes first,
+        # so a contact that is rejected leaves no undo entry behind
+        self.attach_contact(contact)
+
+        # Record the operation for undo
+        operation = ContactOperation('add', contact)
+        self.undo_stack.push(operation)
+
+        # Clear redo queue when new operation is performed
+        self.redo_queue.clear()
+
+    def record_delete(self, contact):
+        """Remove a contact and record the operation in the undo stack."""
+        # Record the operation for undo
+        operation = ContactOperation('delete', contact)
+        self.undo_stack.push(operation)
+
+        # Clear redo queue when new operation is performed
+        self.redo_queue.clear()
+
+        # Remove from tree, BST category index, VIP queue and name indexes
+        self.detach_contact(contact)
+
+    def undo_last_operation(self):
+        """Undo the most recent operation and queue it for redo.
+
+        Returns the undone operation, or None if there was nothing to undo.
+        """
+        if self.undo_stack.is_empty():
+            return None
+
+        operation = self.undo_stack.pop()
+
+        if operation.operation_type == 'add':
+            # Undo an add: remove the contact
+            try:
+                self.detach_contact(operation.contact)
+            except Exception:
+                pass
+        elif operation.operation_type == 'delete':
+            # Undo a delete: restore the contact
+            try:
+                self.attach_contact(operation.contact)
+            except Exception:
+                pass
+        elif operation.operation_type == 'import':
+            # Undo an import: remove the whole batch
+            try:
+                self.detach_contacts(operation.contacts)
+            except Exception:
+                pass
+
+        # Move to redo queue for potential redo
+        self.redo_queue.enqueue(operation)
+        return operation
+
+    def redo_last_operation(self):
+        """Redo the next undone operation and move it back to the undo stack.
+
+        Returns the redone operation, or None if there was nothing to redo.
+        """
+        if self.redo_queue.is_empty():
+            return None
+
+        operation = self.redo_queue.dequeue()
+
+        if operation.operation_type == 'add':
+            # Redo an add: restore the contact
+            try:
+                self.attach_contact(operation.contact)
+            except Exception:
+                pass
+        elif operation.operation_type == 'delete':
+            # Redo a delete: remove the contact again
+            try:
+                self.detach_contact(operation.contact)
+            except Exception:
+                pass
+        elif operation.operation_type == 'import':
+            # Redo an import: restore the whole batch
+            try:
+                self.attach_contacts(operation.contacts)
+            except Exception:
+                pass
+
+        # Move back to undo stack
+        self.undo_stack.push(operation)
+        return operation
+
+    def load_contacts(self, rows):
+        """Rebuild the in-memory structures from ``(id, name, category_path, priority)`` rows.
+
+        The rows come from the operation log's recovery or a store's bulk
+        query. Returns the number of contacts loaded. New contacts are numbered
+        after the highest loaded ID so IDs stay unique across restarts.
+        """
+        batch = [Contact(name, category_path, priority, contact_id=contact_id)
+                 for contact_id, name, category_path, priority in rows]
+        self.attach_contacts(batch, persist=False)
+        if not SHARED_STATE:
+            Contact._next_id.advance_past(max((contact.id for contact in batch), default=0))
+        return len(batch)
+
+    def load(self, seed=()):
+        """Fill the book from its operation log (snapshot plus tail), else the store, else *seed*.
+
+        A log with any history (a snapshot or records) is authoritative even
+        when it replays to no contacts (every one was deleted), so it is
+        never reseeded or loaded from the store on top.
+        """
+        if self.operation_log is not None:
+            recovered = self.load_contacts(self.operation_log.recover())
+            if recovered or self.operation_log.seq:
+                self.loaded = True
+                return
+        loaded_count = 0
+        if self.store is not None:
+            # Writes queued before this book was last evicted must land first
+            if (isinstance(self.writer, WriteBehindQueue)
+                    and not self.writer.flush(timeout=WRITE_FLUSH_TIMEOUT)):
+                raise RuntimeError('Timed out waiting for queued writes before loading the book')
+            loaded_count = self.load_contacts(self.store.load_all(owner=self.owner))
+            if self.operation_log is not None and loaded_count:
+                # The log starts empty here, so capture the loaded book as its base
+                self.operation_log.snapshot()
+        if not loaded_count and seed:
+            self.attach_contacts(seed)
+        self.loaded = True
+
+    def ensure_loaded(self):
+        """Load the book on first use."""
+        if not self.loaded:
+            with self.lock.write_locked():
+                if not self.loaded:
+                    self.load()
+
+    def apply_change(self, op, contact_id, row):
+        """Mirror one change made by another worker into the in-memory structures."""
+        current = self.contacts.get(contact_id)
+        if current is not None:
+            self.detach_contact(current, persist=False)
+        if op == 'save' and row is not None:
+            contact_id, name, category_path, priority = row
+            self.attach_contact(Contact(name, category_path, priority, contact_id=contact_id),
+                                persist=False)
+
+    def reload(self):
+        """Drop every in-memory contact and load the book from the store again."""
+        self.detach_contacts(self.contacts.to_list(), persist=False)
+        self.load_contacts(self.store.load_all(owner=self.owner))
+
+    def close(self):
+        """Flush the book's operation log; called when the book is evicted or at exit."""
+        if self.operation_log is not None:
+            self.operation_log.close()
+
+
+class ContactBookRegistry:
+    """Loaded contact books by owner, least recently used first.
+
+    *factory* builds an empty book for an owner; it is loaded by the first
+    request that uses it. Books idle for *idle_seconds*, or the least
+    recently used beyond *max_books*, are closed and dropped (never while a
+    request is using them, and never the *pinned* owners), so memory
+    follows the number of active users rather than all users.
+    """
+    def __init__(self, factory, max_books=100, idle_seconds=900.0, pinned=()):
+        self.factory = factory
+        self.max_books = max_books
+        self.idle_seconds = idle_seconds
+        self.pinned = set(pinned)
+        self.books = OrderedDict()  # owner -> ContactBook, least recently used first
+        self.evicted = 0
+        self.lock = threading.Lock()
+
+    def get(self, owner):
+        """Return the book for *owner*, creating it (unloaded) if needed."""
+        with self.lock:
+            book = self.books.get(owner)
+            if book is None:
+                book = self.books[owner] = self.factory(owner)
+            return book
+
+    def peek(self, owner):
+        """Return the book for *owner* if it is in memory, else None."""
+        with self.lock:
+            return self.books.get(owner)
+
+    def loaded_books(self):
+        with self.lock:
+            return [book for book in self.books.values() if book.loaded]
+
+    @contextmanager
+    def using(self, owner):
+        """Check out *owner*'s book (loading it if needed) for the length of a request."""
+        with self.lock:
+            book = self.books.get(owner)
+            if book is None:
+                book = self.books[owner] = self.factory(owner)
+            self.books.move_to_end(owner)
+            book.users += 1
+            self._evict()
+        try:
+            book.ensure_loaded()
+            yield book
+        finally:
+            with self.lock:
+                book.users -= 1
+                book.last_used = time.monotonic()
+
+    def _evict(self):
+        now = time.monotonic()
+        for owner, book in list(self.books.items()):
+            if book.users or owner in self.pinned:
+                continue
+            if len(self.books) <= self.max_books and now - book.last_used < self.idle_seconds:
+                break  # everything after this was used more recently
+            del self.books[owner]
+            book.close()
+            self.evicted += 1
+
+    def close_all(self):
+        with self.lock:
+            for book in self.books.values():
+                book.close()
+
+    def __len__(self):
+        return len(self.books)
+
+
+DEFAULT_BOOK = ''
+
+
+def open_book(owner):
+    """Create the (unloaded) book for *owner* with this process's persistence settings."""
+    log_dir = None
+    if OPLOG_DIR:
+        # The default book keeps the top-level log; per-user books get their own directory
+        log_dir = OPLOG_DIR if owner == DEFAULT_BOOK else os.path.join(OPLOG_DIR, 'books', owner)
+    return ContactBook(owner, store=contact_store, writer=contact_writer, log_dir=log_dir)
+
 
+contact_books = ContactBookRegistry(open_book, max_books=BOOK_CACHE_SIZE,
+                                    idle_seconds=BOOK_IDLE_SECONDS, pinned=[DEFAULT_BOOK])
+atexit.register(contact_books.close_all)
+
+if contact_store is not None and not SHARED_STATE:
+    # Books are loaded lazily, so start numbering after every stored contact
+    Contact._next_id.advance_past(contact_store.max_id())
 
-# Initialize data structures
-category_tree = CategoryTree()
-category_bst = CategoryBST()
 contact_hash_table = ContactHashTable()
-vip_queue = PriorityQueue()
+
+
+def apply_shared_change(owner, op, contact_id, row):
+    """Apply a change from another worker to the owner's book, if it is loaded here."""
+    book = contact_books.peek(owner)
+    if book is not None and book.loaded:
+        with book.lock.write_locked():
+            book.apply_change(op, contact_id, row)
+
+
+def reload_shared_books():
+    """Reload every loaded book from the shared store."""
+    for book in contact_books.loaded_books():
+        with book.lock.write_locked():
+            book.reload()
+
 
 # Sample contacts with categories and priorities
 sample_contacts = [
@@ -518,78 +1948,176 @@ sample_contacts = [
     Contact("Frank", ["Work", "HR"], 2),  # VIP
 ]
 
-# Add contacts to tree and BST
-for contact in sample_contacts:
-    category_tree.add_contact(contact)
-    category_bst.insert(tuple(contact.category_path), contact)
-    if contact.priority > 0:
-        vip_queue.push(contact)
-
-# For backward compatibility, create a list of all contacts
-contacts = category_tree.get_all_contacts()
-
-# Undo/Redo stacks and queues
-undo_stack = Stack()
-redo_queue = Queue()
+change_follower = None
+if SHARED_STATE:
+    change_follower = ChangeFollower(contact_store, apply_shared_change, reload_shared_books,
+                                     retention=SHARED_CHANGE_RETENTION)
+    # Mark the change table before loading; changes racing the load are re-applied
+    change_follower.start()
+    Contact._next_id = SharedIdAllocator(contact_store, SHARED_ID_BLOCK)
+
+# Warm start the default book from the operation log (snapshot plus tail) or
+# else the persistent store; seed the sample contacts only into a new store,
+# so a book whose contacts were all deleted stays empty across restarts.
+# Shared workers start concurrently, so they never seed and an empty shared
+# book stays empty. Per-user books start empty and load on first use.
+default_book = contact_books.get(DEFAULT_BOOK)
+seed_samples = not SHARED_STATE and (contact_store is None or contact_store_is_new)
+default_book.load(seed=sample_contacts if seed_samples else [])
+
+# For backward compatibility, expose the default book's structures at module level
+category_tree = default_book.category_tree
+category_bst = default_book.category_bst
+vip_queue = default_book.vip_queue
+name_search_index = default_book.name_search_index
+contact_name_index = default_book.contact_name_index
+contacts = default_book.contacts
+undo_stack = default_book.undo_stack
+redo_queue = default_book.redo_queue
+
+
+def current_owner():
+    """Return the owner of the contact book this request works on."""
+    if not PER_USER_BOOKS:
+        return DEFAULT_BOOK
+    if 'book' not in session:
+        session['book'] = uuid.uuid4().hex
+        session.permanent = True
+    return session['book']
+
+
+def reads_book(func):
+    """Route decorator: load the caller's book into ``g.book`` and hold its read lock."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with contact_books.using(current_owner()) as book, book.lock.read_locked():
+            g.book = book
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def writes_book(func):
+    """Route decorator: load the caller's book into ``g.book`` and hold its write lock."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with contact_books.using(current_owner()) as book, book.lock.write_locked():
+            g.book = book
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@app.before_request
+def follow_shared_changes():
+    """In shared mode, catch up with other workers' writes before handling a request."""
+    if change_follower is not None:
+        change_follower.poll()
 
 
 @app.route('/')
+@reads_book
 def index():
     app.config['FLASK_TITLE'] = "Mohammed Haider "
+    book = g.book
 
     # Get VIP contacts (top 5)
-    vip_contacts = vip_queue.get_top_contacts(5)
+    vip_contacts = book.vip_queue.get_top_contacts(5)
 
-    # Get tree display data
-    tree_data = get_tree_display_data(category_tree.root, contacts_list=contacts)
+    # Get tree display data for the requested page only
+    page_count = max((len(book.contacts) + TREE_PAGE_SIZE - 1) // TREE_PAGE_SIZE, 1)
+    page = min(max(request.args.get('page', 1, type=int), 1), page_count)
+    window = book.contacts.window((page - 1) * TREE_PAGE_SIZE, TREE_PAGE_SIZE)
+    tree_data = [get_tree_row(contact) for contact in window]
+
+    # Top level of the lazily expanded category browser
+    category_data = get_category_node_data(book.category_tree.root, [])
 
     return render_template('index.html',
-                         contacts=contacts,
                          tree_data=tree_data,
+                         page=page,
+                         page_count=page_count,
+                         contact_count=len(book.contacts),
+                         category_data=category_data,
                          vip_contacts=vip_contacts,
                          title=app.config['FLASK_TITLE'],
-                         undo_available=not undo_stack.is_empty(),
-                         redo_available=not redo_queue.is_empty())
+                         undo_available=not book.undo_stack.is_empty(),
+                         redo_available=not book.redo_queue.is_empty(),
+                         undo_count=book.undo_stack.size(),
+                         redo_count=book.redo_queue.size())
+
+@app.route('/tree/node')
+@reads_book
+def tree_node():
+    """
+    Return the HTML fragment for one category node of the tree browser.
+    Called when a category is expanded, so only opened branches are rendered.
+    """
+    category_path = parse_category_path(request.args.get('path', ''))
+    node = g.book.category_tree.root
+    for category in category_path:
+        node = node.children.get(category)
+        if node is None:
+            return '', 404
+    page = max(request.args.get('page', 1, type=int), 1)
+    return render_template('tree_node.html',
+                         node=get_category_node_data(node, category_path, page))
+
 
 @app.route('/add', methods=['POST'])
+@writes_book
 def add_contact():
     """
     Endpoint to add a new contact.
     Records the operation in the undo stack and adds to tree, BST, and VIP queue.
     Clears the redo queue when a new operation is performed.
     """
-    global contacts
-
     name = request.form.get('name')
     category_str = request.form.get('category', '')
-    priority = int(request.form.get('priority', 0))
+    try:
+        priority = int(request.form.get('priority') or 0)
+    except ValueError:
+        flash('Priority must be a whole number.', 'add')
+        return redirect(url_for('index'))
 
     if name:
         # Parse category path
-        category_path = [cat.strip() for cat in category_str.split('->')] if category_str else []
+        category_path = parse_category_path(category_str)
+        error = contact_field_error(name, category_path, priority)
+        if error:
+            flash(f"Contact not added: {error}.", 'add')
+            return redirect(url_for('index'))
 
-        # Create contact
+        # Create contact, record it for undo and add it to every structure
         contact = Contact(name, category_path, priority)
+        g.book.record_add(contact)
 
-        # Record the operation for undo
-        operation = ContactOperation('add', contact)
-        undo_stack.push(operation)
-
-        # Clear redo queue when new operation is performed
-        redo_queue.clear()
-
-        # Add to tree
-        category_tree.add_contact(contact)
-
-        # Add to BST category index
-        category_bst.insert(tuple(category_path), contact)
+    return redirect(url_for('index'))
 
-        # Add to VIP queue if priority > 0
-        if priority > 0:
-            vip_queue.push(contact)
 
-        # Update contacts list
-        contacts = category_tree.get_all_contacts()
+@app.route('/import', methods=['POST'])
+def import_contacts():
+    """
+    Bulk-import contacts from an uploaded CSV or JSON Lines file.
+    The upload is parsed as a stream, inserted as one batch, and recorded
+    as a single operation so one undo removes the whole import.
+    """
+    upload = request.files.get('file')
+    if upload and upload.filename:
+        fmt = request.form.get('format') or import_format_for(upload.filename)
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8', newline='')
+        rejected = []
+        try:
+            with contact_books.using(current_owner()) as book:
+                batch = book.bulk_import(stream, fmt, rejected)
+        except (ValueError, csv.Error) as exc:
+            # Undecodable text, an unknown format or unreadable CSV: nothing was imported
+            flash(f"Import failed: {exc}", 'import')
+        else:
+            message = f"Imported {len(batch):,} contacts from {upload.filename}."
+            if rejected:
+                shown = ', '.join(str(row) for row in rejected[:10])
+                more = ', ...' if len(rejected) > 10 else ''
+                message += f" Skipped {len(rejected):,} invalid rows ({shown}{more})."
+            flash(message, 'import')
 
     return redirect(url_for('index'))
 
@@ -614,180 +2142,386 @@ def contacts_page():
                          redo_available=not redo_queue.is_empty())
 
 @app.route('/search')
+@reads_book
 def search():
     """
     Search for contacts by name.
 
-    Performs a linear scan over contacts to find matches.
-    Matches are treated case-insensitively.
+    Looks matches up in the trigram name index and streams the response:
+    the page is capped at SEARCH_PAGE_SIZE, with a continuation token
+    linking to the next page. Matches are treated case-insensitively.
     """
     raw_query = request.args.get('q', '')
     query = raw_query.strip().lower()
+    book = g.book
 
-    search_results = []
-    if query:
-        # perform linear scan over contacts
-        for i, contact in enumerate(contacts):
-            if query in contact.name.lower():
-                search_results.append((i, contact))
-        # sort the results by contact name using quick sort
-        if search_results:
-            search_results = quick_sort(search_results, key=lambda pair: pair[1].name.lower())
-
-    return render_template('search_results.html',
+    matches = book.name_search_index.matches(query) if query else []
+    after = decode_search_token(request.args.get('after'))
+    # The template streams after the read lock is released, so pull this
+    # page (plus one to detect more) out while it is held
+    page = list(itertools.islice(book.name_search_index.iter_ordered(matches, after),
+                                 SEARCH_PAGE_SIZE + 1))
+    results = SearchResultStream(page, SEARCH_PAGE_SIZE, SubstringIndex.key_of)
+
+    return stream_template('search_results.html',
                          query=raw_query,
-                         results=search_results,
-                         result_count=len(search_results),
-                         undo_available=not undo_stack.is_empty(),
-                         redo_available=not redo_queue.is_empty())
+                         results=results,
+                         result_count=len(matches),
+                         undo_available=not book.undo_stack.is_empty(),
+                         redo_available=not book.redo_queue.is_empty())
 
 
-@app.route('/delete/<int:idx>', methods=['POST'])
-def delete_contact(idx):
+@app.route('/delete/<int:contact_id>', methods=['POST'])
+@writes_book
+def delete_contact(contact_id):
     """
-    Remove a contact from the tree by index and record it for undo.
+    Remove a contact from the tree by its stable ID and record it for undo.
     Records the deletion in the undo stack and removes from tree, BST, and VIP queue.
     """
-    global contacts
-
-    try:
-        contact = contacts[idx]
-
-        # Record the operation for undo
-        operation = ContactOperation('delete', contact)
-        undo_stack.push(operation)
-
-        # Clear redo queue when new operation is performed
-        redo_queue.clear()
-
-        # Remove from tree
-        category_tree.remove_contact(contact)
-
-        # Remove from BST category index
-        category_bst.remove(tuple(contact.category_path), contact)
-
-        # Remove from VIP queue if present
-        if contact.priority > 0:
-            vip_queue.remove(contact)
-
-        # Update contacts list
-        contacts = category_tree.get_all_contacts()
-    except Exception:
-        pass
+    contact = g.book.contacts.get(contact_id)
+    if contact is not None:
+        g.book.record_delete(contact)
 
     next_url = request.form.get('next') or request.args.get('next') or url_for('index')
     return redirect(next_url)
 
 
 @app.route('/undo', methods=['POST'])
+@writes_book
 def undo():
     """
-    Undo the last operation (add or delete) using the undo stack.
+    Undo the last operation (add, delete or import) using the undo stack.
     Moves the undone operation to the redo queue for potential redo.
     """
-    global contacts
-
     # Prefer form 'next' (from POST), then querystring 'next', otherwise go home
     next_url = request.form.get('next') or request.args.get('next') or url_for('index')
 
-    if undo_stack.is_empty():
-        return redirect(next_url)
-
-    operation = undo_stack.pop()
-
-    if operation.operation_type == 'add':
-        # Undo an add: remove the contact
-        try:
-            category_tree.remove_contact(operation.contact)
-            category_bst.remove(tuple(operation.contact.category_path), operation.contact)
-            if operation.contact.priority > 0:
-                vip_queue.remove(operation.contact)
-            contacts = category_tree.get_all_contacts()
-        except Exception:
-            pass
-    elif operation.operation_type == 'delete':
-        # Undo a delete: restore the contact
-        try:
-            category_tree.add_contact(operation.contact)
-            category_bst.insert(tuple(operation.contact.category_path), operation.contact)
-            if operation.contact.priority > 0:
-                vip_queue.push(operation.contact)
-            contacts = category_tree.get_all_contacts()
-        except Exception:
-            pass
-
-    # Move to redo queue for potential redo
-    redo_queue.enqueue(operation)
+    g.book.undo_last_operation()
 
     return redirect(next_url)
 
 
 @app.route('/redo', methods=['POST'])
+@writes_book
 def redo():
     """
-    Redo the last undone operation (add or delete) using the redo queue.
+    Redo the last undone operation (add, delete or import) using the redo queue.
     Moves the redone operation back to the undo stack.
     """
-    global contacts
-
     # Prefer form 'next' (from POST), then querystring 'next', otherwise go home
     next_url = request.form.get('next') or request.args.get('next') or url_for('index')
 
-    if redo_queue.is_empty():
-        return redirect(next_url)
+    g.book.redo_last_operation()
 
-    operation = redo_queue.dequeue()
+    return redirect(next_url)
 
-    if operation.operation_type == 'add':
-        # Redo an add: restore the contact
-        try:
-            category_tree.add_contact(operation.contact)
-            category_bst.insert(tuple(operation.contact.category_path), operation.contact)
-            if operation.contact.priority > 0:
-                vip_queue.push(operation.contact)
-            contacts = category_tree.get_all_contacts()
-        except Exception:
-            pass
-    elif operation.operation_type == 'delete':
-        # Redo a delete: remove the contact again
-        try:
-            category_tree.remove_contact(operation.contact)
-            category_bst.remove(tuple(operation.contact.category_path), operation.contact)
-            if operation.contact.priority > 0:
-                vip_queue.remove(operation.contact)
-            contacts = category_tree.get_all_contacts()
-        except Exception:
-            pass
 
-    # Move back to undo stack
-    undo_stack.push(operation)
+# ============================================================================
+# JSON API (v1)
+# ============================================================================
 
-    return redirect(next_url)
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 1000
 
 
-def get_tree_display_data(tree_node, path=[], contacts_list=None):
-    """Get display data for tree visualization."""
-    if contacts_list is None:
-        contacts_list = []
+def contact_to_dict(contact, fields=None):
+    """Serialize a contact for the JSON API, keeping only *fields* when given."""
+    data = {
+        'id': contact.id,
+        'name': contact.name,
+        'category_path': list(contact.category_path),
+        'category': contact.get_category_string(),
+        'priority': contact.priority,
+    }
+    if fields:
+        data = {field: value for field, value in data.items() if field in fields}
+    return data
 
-    data = []
-    current_path = path + [tree_node.name]
 
-    # Add contacts at this level
-    for contact in tree_node.contacts:
-        contact_index = contacts_list.index(contact) if contact in contacts_list else -1
-        data.append({
-            'path': current_path[1:],  # Skip 'Root'
-            'contact': contact,
-            'level': len(current_path) - 1,
-            'index': contact_index
-        })
+def api_fields():
+    """Parse the ``fields`` query parameter (comma separated) into a set, or None."""
+    fields = request.args.get('fields')
+    return {field.strip() for field in fields.split(',') if field.strip()} if fields else None
 
-    # Recursively add children
-    for child_name, child_node in sorted(tree_node.children.items()):
-        data.extend(get_tree_display_data(child_node, current_path, contacts_list))
 
-    return data
+def api_page_args():
+    """Parse ``offset`` and ``limit`` query parameters, clamped to sane bounds."""
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', API_PAGE_SIZE, type=int), 0), API_MAX_PAGE_SIZE)
+    return offset, limit
+
+
+def api_error(message, status):
+    return jsonify({'error': message}), status
+
+
+API_QUERY_ARGS = ('min_priority', 'max_priority', 'category', 'q', 'sort')
+
+
+def api_query_rows(book):
+    """Run the columnar query described by the filter arguments, ordered by ``sort``.
+
+    Returns the matching rows of ``book.columns``, or None when the request
+    has no filter arguments. Raises ValueError for an unknown sort order.
+    """
+    if not any(name in request.args for name in API_QUERY_ARGS):
+        return None
+    columns = book.columns
+    rows = None
+    query = request.args.get('q', '').strip()
+    if query:
+        rows = columns.rows_for(book.name_search_index.matches(query))
+    category = request.args.get('category')
+    rows = columns.select(min_priority=request.args.get('min_priority', type=int),
+                          max_priority=request.args.get('max_priority', type=int),
+                          category_path=parse_category_path(category) if category else None,
+                          rows=rows)
+    return columns.order(rows, by=request.args.get('sort', 'name'))
+
+
+def api_history():
+    book = g.book
+    return {
+        'undo_available': not book.undo_stack.is_empty(),
+        'redo_available': not book.redo_queue.is_empty(),
+        'undo_count': book.undo_stack.size(),
+        'redo_count': book.redo_queue.size(),
+    }
+
+
+@app.route('/api/v1/metrics')
+@reads_book
+def api_metrics():
+    """Report sizes of the caller's book, the loaded books and the persistence write queue."""
+    book = g.book
+    writer = contact_writer if isinstance(contact_writer, WriteBehindQueue) else None
+    return jsonify(dict(api_history(),
+                        contacts=len(book.contacts),
+                        vip_contacts=book.vip_queue.size(),
+                        categories=book.category_bst.size,
+                        books_loaded=len(contact_books),
+                        books_evicted=contact_books.evicted,
+                        store=CONTACT_STORE or None,
+                        write_queue_depth=writer.depth if writer else 0,
+                        write_queue_written=writer.written if writer else 0,
+                        write_queue_failures=writer.failures if writer else 0,
+                        write_queue_dead_letters=len(writer.dead_letters) if writer else 0,
+                        oplog_seq=book.operation_log.seq if book.operation_log else None,
+                        shared_seq=change_follower.applied_seq if change_follower else None))
+
+
+@app.route('/api/v1/contacts', methods=['GET'])
+@reads_book
+def api_list_contacts():
+    """
+    List contacts one page at a time (``offset``, ``limit``, ``fields``).
+
+    Without filters the pages follow tree order. Any of ``min_priority``,
+    ``max_priority``, ``category`` (an "A -> B" path, subcategories
+    included), ``q`` (name substring) or ``sort`` (``name`` or
+    ``priority``) runs the query on the book's columnar store instead.
+    """
+    offset, limit = api_page_args()
+    fields = api_fields()
+    try:
+        rows = api_query_rows(g.book)
+    except ValueError as exc:
+        return api_error(str(exc), 400)
+    if rows is None:
+        contacts = g.book.contacts
+        total = len(contacts)
+        page = contacts.window(offset, limit)
+    else:
+        total = len(rows)
+        page = g.book.columns.contacts(rows[offset:offset + limit])
+    next_offset = offset + len(page)
+    return jsonify({
+        'contacts': [contact_to_dict(contact, fields) for contact in page],
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        # An empty page (limit=0) must not hand back its own offset
+        'next_offset': next_offset if page and next_offset < total else None,
+    })
+
+
+@app.route('/api/v1/contacts/<int:contact_id>', methods=['GET'])
+@reads_book
+def api_get_contact(contact_id):
+    """Return a single contact by ID."""
+    contact = g.book.contacts.get(contact_id)
+    if contact is None:
+        return api_error('contact not found', 404)
+    return jsonify(contact_to_dict(contact, api_fields()))
+
+
+@app.route('/api/v1/contacts', methods=['POST'])
+@writes_book
+def api_create_contact():
+    """
+    Create a contact from a JSON body: ``name``, optional ``category``
+    (a "A -> B" string or a list of levels) and ``priority``.
+    Recorded for undo like the form-based add.
+    """
+    body = request.get_json(silent=True)
+    if body is None:
+        body = {}
+    if not isinstance(body, dict):
+        return api_error('request body must be a JSON object', 400)
+    name = body.get('name') or ''
+    if not isinstance(name, str):
+        return api_error('name must be a string', 400)
+    name = name.strip()
+    if not name:
+        return api_error('name is required', 400)
+    category = category_levels(body.get('category'))
+    if category is None:
+        return api_error('category must be a string or a list of strings without "->"', 400)
+    try:
+        priority = int(body.get('priority') or 0)
+    except (TypeError, ValueError):
+        return api_error('priority must be an integer', 400)
+
+    error = contact_field_error(name, category, priority)
+    if error:
+        return api_error(error, 400)
+
+    contact = Contact(name, category, priority)
+    g.book.record_add(contact)
+    return jsonify(contact_to_dict(contact)), 201
+
+
+@app.route('/api/v1/contacts/<int:contact_id>', methods=['DELETE'])
+@writes_book
+def api_delete_contact(contact_id):
+    """Delete a contact by ID, recording it for undo."""
+    contact = g.book.contacts.get(contact_id)
+    if contact is None:
+        return api_error('contact not found', 404)
+    g.book.record_delete(contact)
+    return jsonify(contact_to_dict(contact))
+
+
+@app.route('/api/v1/undo', methods=['POST'])
+@writes_book
+def api_undo():
+    """Undo the last operation and report the resulting history state."""
+    operation = g.book.undo_last_operation()
+    return jsonify(dict(api_history(), undone=operation.operation_type if operation else None))
+
+
+@app.route('/api/v1/redo', methods=['POST'])
+@writes_book
+def api_redo():
+    """Redo the last undone operation and report the resulting history state."""
+    operation = g.book.redo_last_operation()
+    return jsonify(dict(api_history(), redone=operation.operation_type if operation else None))
+
+
+@app.route('/api/v1/categories', defaults={'category_path': ''})
+@app.route('/api/v1/categories/<path:category_path>')
+@reads_book
+def api_category(category_path):
+    """
+    Describe a category, e.g. ``/api/v1/categories/Work/Engineering``.
+    Returns its direct subcategories, contact count and top priority from
+    the CategoryTree and a page of every contact filed under it, taken
+    lazily from the tree's subtree walk, so only the page is materialized.
+    """
+    levels = [level for level in category_path.split('/') if level]
+    node = g.book.category_tree.root
+    for level in levels:
+        node = node.children.get(level)
+        if node is None:
+            return api_error('category not found', 404)
+
+    offset, limit = api_page_args()
+    fields = api_fields()
+    page = list(itertools.islice(node.iter_contacts(), offset, offset + limit + 1))
+    return jsonify({
+        'path': levels,
+        'subcategories': sorted(node.children),
+        'count': node.count,
+        'max_priority': node.max_priority,
+        'contacts': [contact_to_dict(contact, fields) for contact in page[:limit]],
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + limit if limit and len(page) > limit else None,
+    })
+
+
+@app.route('/api/v1/category-suggestions')
+@reads_book
+def api_category_suggestions():
+    """Autocomplete a category string (``q``), e.g. ``Work -> Eng``, with up to ``limit`` existing paths."""
+    limit = min(max(request.args.get('limit', 10, type=int), 0), API_MAX_PAGE_SIZE)
+    suggestions = g.book.category_tree.suggest(request.args.get('q', ''), limit)
+    return jsonify({'suggestions': [{'category': ' -> '.join(path), 'category_path': path, 'count': count}
+                                    for path, count in suggestions]})
+
+
+@app.route('/api/v1/vip')
+@reads_book
+def api_vip():
+    """Return the ``top`` highest priority contacts (default 5), optionally under a ``category``."""
+    top = min(max(request.args.get('top', 5, type=int), 0), API_MAX_PAGE_SIZE)
+    fields = api_fields()
+    category = request.args.get('category')
+    if category:
+        columns = g.book.columns
+        rows = columns.select(min_priority=1, category_path=parse_category_path(category))
+        vip_contacts = columns.contacts(columns.top_k(top, rows))
+    else:
+        vip_contacts = g.book.vip_queue.get_top_contacts(top)
+    return jsonify({'contacts': [contact_to_dict(contact, fields) for contact in vip_contacts]})
+
+
+@app.route('/api/v1/search')
+@reads_book
+def api_search():
+    """Search contact names (``q``), paged with ``limit`` and an ``after`` continuation token."""
+    query = request.args.get('q', '').strip().lower()
+    _, limit = api_page_args()
+    fields = api_fields()
+    search_index = g.book.name_search_index
+    matches = search_index.matches(query) if query else []
+    after = decode_search_token(request.args.get('after'))
+    results = SearchResultStream(search_index.iter_ordered(matches, after),
+                                 limit,
+                                 search_index.key_of)
+    page = [contact_to_dict(contact, fields) for contact in results]
+    return jsonify({
+        'query': query,
+        'total': len(matches),
+        'contacts': page,
+        'next': results.next_token,
+    })
+
+
+def get_tree_row(contact):
+    """Get the tree view display row for a single contact."""
+    return {
+        'path': list(contact.category_path),
+        'contact': contact,
+        'level': len(contact.category_path),
+        'id': contact.id
+    }
+
+
+def get_category_node_data(tree_node, category_path, page=1):
+    """Get display data for one category node: its subcategories and a page of its own contacts."""
+    start = (page - 1) * CATEGORY_PAGE_SIZE
+    node_contacts = tree_node.contacts[start:start + CATEGORY_PAGE_SIZE]
+    return {
+        'path': category_path,
+        'children': [(name, ' -> '.join(category_path + [name]), child.count)
+                     for name, child in sorted(tree_node.children.items())],
+        'contacts': node_contacts,
+        'page': page,
+        'has_more': start + CATEGORY_PAGE_SIZE < len(tree_node.contacts),
+        'path_string': ' -> '.join(category_path)
+    }
+
 
 if __name__ == '__main__':
     # Run the Flask app on port 5000, accessible externally
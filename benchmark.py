@@ -1,6 +1,12 @@
 import time
 import random
 import string
+import sys
+import threading
+from collections import namedtuple
+
+from name_index import SortedNameIndex
+from sorting import merge_sort
 
 # ============================================================================
 # Search Algorithm Implementations
@@ -26,55 +32,23 @@ def linear_search(contact_id, contacts):
     return None
 
 
-def binary_search(contact_id, sorted_contacts):
-    """Binary search to find a contact by name in a sorted list.
+def binary_search(contact_id, name_index):
+    """Binary search to find a contact by name in a sorted name index.
+    
+    The index stores pre-casefolded keys, so each probe is a plain string
+    comparison via ``bisect`` rather than a ``.lower()`` call.
     
     Time Complexity: O(log n) where n is the number of contacts.
     Space Complexity: O(1)
     
     Args:
         contact_id: The contact name to search for.
-        sorted_contacts: A sorted list of contact names.
+        name_index: A SortedNameIndex of contact names.
     
     Returns:
         A tuple (index, contact_name) if found, otherwise None.
     """
-    if not sorted_contacts:
-        return None
-    
-    left = 0
-    right = len(sorted_contacts) - 1
-    contact_id_lower = contact_id.lower()
-    
-    while left <= right:
-        mid = (left + right) // 2
-        mid_contact = sorted_contacts[mid]
-        mid_contact_lower = mid_contact.lower()
-        
-        if mid_contact_lower == contact_id_lower:
-            return (mid, mid_contact)
-        elif mid_contact_lower < contact_id_lower:
-            left = mid + 1
-        else:
-            right = mid - 1
-    
-    return None
-
-
-def quick_sort(arr, key=lambda x: x):
-    """Quick sort implementation.
-    
-    Time Complexity: O(n log n) average case.
-    Space Complexity: O(n) for the new lists created.
-    """
-    if len(arr) <= 1:
-        return arr[:]
-    pivot = arr[len(arr) // 2]
-    pivot_key = key(pivot)
-    left = [x for x in arr if key(x) < pivot_key]
-    middle = [x for x in arr if key(x) == pivot_key]
-    right = [x for x in arr if key(x) > pivot_key]
-    return quick_sort(left, key) + middle + quick_sort(right, key)
+    return name_index.find(contact_id)
 
 
 # ============================================================================
@@ -154,7 +128,8 @@ def run_benchmark_suite():
         
         # Generate test data
         contacts = generate_test_data(size)
-        sorted_contacts = quick_sort(contacts, key=lambda x: x.lower())
+        sorted_contacts = merge_sort(contacts, key=str.lower)
+        name_index = SortedNameIndex(contacts)
         
         # Select random search targets (from middle, end, and various positions)
         num_searches = min(100, size // 10)
@@ -173,11 +148,16 @@ def run_benchmark_suite():
         binary_total, binary_avg = benchmark_search(
             'Binary Search',
             binary_search,
-            sorted_contacts,
+            name_index,
             search_targets,
             iterations=1
         )
         
+        # Benchmark one batched lookup of every target
+        batch_start = time.perf_counter()
+        name_index.find_many(search_targets)
+        batch_avg = (time.perf_counter() - batch_start) / len(search_targets)
+        
         # Calculate speedup
         speedup = linear_total / binary_total if binary_total > 0 else 0
         
@@ -187,6 +167,7 @@ def run_benchmark_suite():
         
         print(f"  Linear Search:  {linear_avg:.9f} seconds (avg per search)")
         print(f"  Binary Search:  {binary_avg:.9f} seconds (avg per search)")
+        print(f"  Batch Lookup:   {batch_avg:.9f} seconds (avg per name)")
         print(f"  Speedup:        {speedup:.2f}x faster")
         print()
     
@@ -227,5 +208,231 @@ def run_benchmark_suite():
     print()
 
 
+
+# ============================================================================
+# Storage Backend Benchmark
+# ============================================================================
+
+# Same attributes the contact store reads from the app's Contact objects
+StoredContact = namedtuple('StoredContact', ['id', 'name', 'category_path', 'priority', 'owner'],
+                           defaults=[''])
+
+
+def run_storage_benchmark(backend_urls, size=20000):
+    """Compare contact store backends on batched writes, bulk loads and paged reads.
+    
+    Args:
+        backend_urls: A dict mapping backend name ('postgres', 'mssql',
+            'sqlite') to its SQLAlchemy connection URL.
+        size: Number of contacts written and read back per backend.
+    """
+    from storage import create_store
+
+    print("=" * 80)
+    print(f"BENCHMARK: Contact Store Backends ({size:,} contacts)")
+    print("=" * 80)
+    print(f"{'Backend':<12} {'Save (s)':<14} {'Load all (s)':<14} {'Paged (s)':<14} {'Delete (s)':<14}")
+    print("-" * 80)
+
+    names = generate_test_data(size)
+    departments = ['Engineering', 'Sales', 'HR', 'Support']
+    batch = [StoredContact(i + 1, name, ['Work', departments[i % len(departments)]], i % 6)
+             for i, name in enumerate(names)]
+
+    for backend, url in backend_urls.items():
+        store = create_store(backend, url)
+        store.create_schema()
+        store.clear()
+
+        start = time.perf_counter()
+        store.save_many(batch)
+        save_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = sum(1 for _ in store.load_all())
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        after_id, paged = 0, 0
+        while True:
+            page = store.load_page(after_id, limit=1000)
+            if not page:
+                break
+            paged += len(page)
+            after_id = page[-1][0]
+        page_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.delete_many([contact.id for contact in batch])
+        delete_time = time.perf_counter() - start
+
+        assert loaded == paged == size
+        print(f"{backend:<12} {save_time:<14.4f} {load_time:<14.4f} {page_time:<14.4f} {delete_time:<14.4f}")
+    print()
+
+
+def run_memory_benchmark(size=100000):
+    """Measure the memory cost per contact of a fully indexed contact book.
+
+    Uses tracemalloc to split the total into name strings, the Contact
+    objects themselves (with their category paths), and the book's tree,
+    BST, VIP heap and name indexes.
+
+    Args:
+        size: Number of contacts to build.
+    """
+    import tracemalloc
+    import app as contact_app
+
+    print("=" * 80)
+    print(f"BENCHMARK: Memory per Contact ({size:,} contacts)")
+    print("=" * 80)
+
+    departments = ['Engineering', 'Sales', 'HR', 'Support']
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    names = [name + f" {i}" for i, name in enumerate(generate_test_data(size))]
+    after_names = tracemalloc.get_traced_memory()[0]
+    # Each row gets its own path list, as parsed from an import file
+    batch = [contact_app.Contact(name, ['Work', departments[i % len(departments)], f"Team {i % 50}"], i % 6)
+             for i, name in enumerate(names)]
+    after_contacts = tracemalloc.get_traced_memory()[0]
+    book = contact_app.ContactBook(owner='memory-benchmark')
+    book.attach_contacts(batch, persist=False)
+    after_book = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rows = [
+        ('Name strings', after_names - before),
+        ('Contact objects', after_contacts - after_names),
+        ('Book indexes', after_book - after_contacts),
+        ('Total', after_book - before),
+    ]
+    print(f"{'Component':<20} {'Total (MB)':<14} {'Per contact (bytes)':<20}")
+    print("-" * 80)
+    for label, used in rows:
+        print(f"{label:<20} {used / 2**20:<14.1f} {used / size:<20.0f}")
+    print()
+    print(f"Projected for 1,000,000 contacts: {rows[-1][1] / size * 1e6 / 2**30:.2f} GB")
+    print()
+
+
+def run_concurrency_stress(threads=8, seconds=5.0):
+    """Hammer the app from many threads at once, then check every index agrees.
+
+    Half the threads add, delete, undo and redo through the HTML and JSON
+    routes while the rest read the index page, searches and API listings.
+    Any failed request, or any disagreement afterwards between the tree,
+    BST, VIP heap and name indexes, is reported and fails the run.
+
+    Args:
+        threads: Number of client threads (at least 2).
+        seconds: How long the threads keep issuing requests.
+    """
+    import app as contact_app
+
+    print("=" * 80)
+    print(f"STRESS TEST: Concurrent Access ({threads} threads, {seconds:g}s)")
+    print("=" * 80)
+
+    deadline = time.perf_counter() + seconds
+    errors = []
+
+    def writer(slot):
+        client = contact_app.app.test_client()
+        rng = random.Random(slot)
+        while time.perf_counter() < deadline:
+            action = rng.random()
+            if action < 0.5:
+                response = client.post('/api/v1/contacts', json={
+                    'name': f"Stress{slot}-{counts[slot]}",
+                    'category': f"Stress -> Group {rng.randrange(10)}",
+                    'priority': rng.randrange(4)})
+            elif action < 0.7:
+                listing = client.get('/api/v1/contacts?limit=20&fields=id').get_json()
+                ids = [item['id'] for item in listing['contacts']]
+                response = client.delete(f"/api/v1/contacts/{rng.choice(ids)}") if ids else listing
+            elif action < 0.85:
+                response = client.post('/undo')
+            else:
+                response = client.post('/redo')
+            if getattr(response, 'status_code', 200) >= 500:
+                errors.append(f"writer {slot}: HTTP {response.status_code}")
+            counts[slot] += 1
+
+    def reader(slot):
+        client = contact_app.app.test_client()
+        rng = random.Random(slot)
+        paths = ['/', '/search?q=stress', '/api/v1/contacts?limit=100',
+                 '/api/v1/vip?top=10', '/api/v1/search?q=a', '/api/v1/categories/Stress',
+                 '/api/v1/categories/Stress/Group%203']
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            response = client.get(path)
+            response.get_data()
+            # Every read path exists, so anything but success means a broken read
+            if response.status_code >= 400:
+                errors.append(f"reader {slot}: HTTP {response.status_code} for {path}")
+            counts[slot] += 1
+
+    def guarded(target, slot):
+        try:
+            target(slot)
+        except Exception as exc:
+            errors.append(f"{target.__name__} {slot}: {exc!r}")
+
+    # File one contact in each stress category up front so the category reads always resolve
+    setup = contact_app.app.test_client()
+    for group in range(10):
+        setup.post('/api/v1/contacts', json={'name': f"StressSeed-{group}",
+                                             'category': f"Stress -> Group {group}"})
+
+    workers = [threading.Thread(target=guarded, args=(writer if slot % 2 == 0 else reader, slot))
+               for slot in range(max(threads, 2))]
+    counts = [0] * len(workers)
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    book = contact_app.default_book
+    with book.lock.read_locked():
+        contacts = book.contacts
+        expected = {contact.id for contact in contacts}
+        tree_ids = {contact.id for contact in book.category_tree.root.get_all_contacts()}
+        bst_ids = [contact.id for _, group in book.category_bst.range_items(()) for contact in group]
+        vips = [contact for contact in contacts if contact.priority > 0]
+        checks = {
+            'tree': tree_ids == expected,
+            'tree counts': book.category_tree.count() == len(expected),
+            'bst': len(bst_ids) == len(expected) and set(bst_ids) == expected,
+            'vip heap': book.vip_queue.size() == len(vips)
+                        and all(contact in book.vip_queue for contact in vips),
+            'substring index': len(book.name_search_index) == len(expected),
+            'name index': {contact.id for contact in book.contact_name_index} == expected,
+        }
+
+    print(f"Requests: {sum(counts):,} ({sum(counts) / seconds:,.0f}/s)   Contacts: {len(expected):,}")
+    for name, ok in checks.items():
+        print(f"  {name:<18} {'consistent' if ok else 'MISMATCH'}")
+    for error in errors[:10]:
+        print(f"  {error}")
+    print()
+    if errors or not all(checks.values()):
+        sys.exit(1)
+
+
 if __name__ == '__main__':
-    run_benchmark_suite()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == 'memory':
+        # python benchmark.py memory [size]
+        run_memory_benchmark(*(int(arg) for arg in sys.argv[2:3]))
+    elif len(sys.argv) > 1 and sys.argv[1] == 'stress':
+        # python benchmark.py stress [threads] [seconds]
+        run_concurrency_stress(*(int(arg) for arg in sys.argv[2:3]),
+                               *(float(arg) for arg in sys.argv[3:4]))
+    elif len(sys.argv) > 1 and sys.argv[1] == 'storage':
+        # python benchmark.py storage [backend=url ...]; defaults to in-memory SQLite
+        urls = dict(arg.split('=', 1) for arg in sys.argv[2:]) or {'sqlite': 'sqlite:///:memory:'}
+        run_storage_benchmark(urls)
+    else:
+        run_benchmark_suite()
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""Column-oriented copy of a contact book for vectorized filtering and sorting.
+
+Each contact is one row across parallel columns: ID, priority and category
+path ID (an index into a table of distinct paths) in compact ``array``
+columns, plus the casefolded name and the Contact object itself. Rows are
+unordered; a delete moves the last row into the hole. Queries work on row
+numbers, and ``contacts`` turns them back into Contact objects, so callers
+keep using the object API.
+
+NumPy is optional. When it is installed, filters, argsort and top-k run as
+array operations on zero-copy views of the ``array`` columns; without it the
+same queries run as loops over the compact columns.
+"""
+import heapq
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # optional: fall back to plain loops
+    np = None
+
+from name_index import normalize_name
+from sorting import merge_sort
+
+
+class ContactColumns:
+    """Parallel-array store of contacts supporting filter, order and top-k queries.
+
+    The view arrays handed to NumPy borrow the columns' buffers, which
+    cannot grow while borrowed, so queries and writes must not overlap
+    (the contact book's lock already guarantees that).
+    """
+    def __init__(self):
+        self.ids = array('q')
+        self.priorities = array('q')
+        self.path_ids = array('q')
+        self.names = []  # casefolded names, the name sort key
+        self.objects = []  # the Contact for each row
+        self.rows = {}  # contact ID -> row number
+        self.paths = []  # path ID -> category path tuple
+        self.path_table = {}  # category path tuple -> path ID
+
+    def _columns(self):
+        return (self.ids, self.priorities, self.path_ids, self.names, self.objects)
+
+    def _path_id(self, category_path):
+        path_id = self.path_table.get(category_path)
+        if path_id is None:
+            path_id = self.path_table[category_path] = len(self.paths)
+            self.paths.append(category_path)
+        return path_id
+
+    # Range of the signed 64-bit ('q') columns
+    INT_MIN, INT_MAX = -2**63, 2**63 - 1
+
+    def check(self, contact):
+        """Raise ValueError if *contact* cannot be stored in the columns.
+
+        Call it before changing anything else, so a contact that does not
+        fit is rejected everywhere rather than half-added.
+        """
+        for field, value in (('id', contact.id), ('priority', contact.priority)):
+            if not self.INT_MIN <= value <= self.INT_MAX:
+                raise ValueError(f"Contact {field} {value} does not fit a 64-bit column")
+
+    def add(self, contact):
+        """Append a row for *contact*, unless it already has one."""
+        if contact.id in self.rows:
+            return
+        self.check(contact)
+        self.rows[contact.id] = len(self.objects)
+        self.ids.append(contact.id)
+        self.priorities.append(contact.priority)
+        self.path_ids.append(self._path_id(tuple(contact.category_path)))
+        self.names.append(normalize_name(contact.name))
+        self.objects.append(contact)
+
+    def add_many(self, contacts):
+        for contact in contacts:
+            self.add(contact)
+
+    def remove(self, contact_id):
+        """Drop the row for *contact_id*. Returns False if there is none."""
+        row = self.rows.pop(contact_id, None)
+        if row is None:
+            return False
+        last = len(self.objects) - 1
+        if row != last:
+            for column in self._columns():
+                column[row] = column[last]
+            self.rows[self.ids[row]] = row
+        for column in self._columns():
+            column.pop()
+        return True
+
+    def remove_many(self, contact_ids):
+        for contact_id in contact_ids:
+            self.remove(contact_id)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def _path_ids_under(self, category_path):
+        """IDs of every known path equal to or below *category_path*."""
+        prefix = tuple(category_path)
+        width = len(prefix)
+        return [path_id for path_id, path in enumerate(self.paths) if path[:width] == prefix]
+
+    def rows_for(self, contacts):
+        """Row numbers of the given contacts (skipping any without a row)."""
+        return [self.rows[contact.id] for contact in contacts if contact.id in self.rows]
+
+    def select(self, min_priority=None, max_priority=None, category_path=None, rows=None):
+        """Return the rows matching every given filter, e.g. priority >= 3 under ``('Work',)``.
+
+        *category_path* matches that category and everything below it.
+        *rows* restricts the search to those rows (say, name search hits).
+        """
+        wanted_paths = None if category_path is None else self._path_ids_under(category_path)
+        if not self.objects or wanted_paths == []:
+            return []
+        if np is not None:
+            priorities = np.frombuffer(self.priorities, dtype=np.int64)
+            mask = np.ones(len(priorities), dtype=bool)
+            if min_priority is not None:
+                mask &= priorities >= min_priority
+            if max_priority is not None:
+                mask &= priorities <= max_priority
+            if wanted_paths is not None:
+                mask &= np.isin(np.frombuffer(self.path_ids, dtype=np.int64), wanted_paths)
+            if rows is not None:
+                selected = np.asarray(rows, dtype=np.intp)
+                return selected[mask[selected]]
+            return np.flatnonzero(mask)
+
+        wanted_paths = None if wanted_paths is None else set(wanted_paths)
+        priorities, path_ids = self.priorities, self.path_ids
+        return [row for row in (range(len(self.objects)) if rows is None else rows)
+                if (min_priority is None or priorities[row] >= min_priority)
+                and (max_priority is None or priorities[row] <= max_priority)
+                and (wanted_paths is None or path_ids[row] in wanted_paths)]
+
+    def order(self, rows, by='name'):
+        """Sort *rows* by ``'name'`` (then ID) or ``'priority'`` (highest first, then name and ID)."""
+        if by not in ('name', 'priority'):
+            raise ValueError(f"Unknown sort order: {by!r}")
+        if len(rows) == 0:
+            return []
+        if np is not None:
+            rows = np.asarray(rows, dtype=np.intp)
+            ids = np.frombuffer(self.ids, dtype=np.int64)[rows]
+            names = np.array([self.names[row] for row in rows])
+            if by == 'name':
+                keys = (ids, names)
+            else:
+                keys = (ids, names, -np.frombuffer(self.priorities, dtype=np.int64)[rows])
+            # lexsort treats the last key as the primary one
+            return rows[np.lexsort(keys)]
+        if by == 'name':
+            return merge_sort(rows, key=lambda row: (self.names[row], self.ids[row]))
+        return merge_sort(rows, key=lambda row: (-self.priorities[row], self.names[row], self.ids[row]))
+
+    def top_k(self, k, rows=None):
+        """Return the *k* highest priority rows (of *rows*, or all), best first."""
+        if rows is None:
+            rows = range(len(self.objects)) if np is None else np.arange(len(self.objects))
+        if k <= 0 or len(rows) == 0:
+            return []
+        if np is not None:
+            rows = np.asarray(rows, dtype=np.intp)
+            if k < len(rows):
+                priorities = np.frombuffer(self.priorities, dtype=np.int64)[rows]
+                # Keep every row tied with the k-th best priority so ties break by name
+                threshold = np.partition(priorities, len(rows) - k)[len(rows) - k]
+                rows = rows[priorities >= threshold]
+            return self.order(rows, by='priority')[:k]
+        return heapq.nsmallest(k, rows, key=lambda row: (-self.priorities[row],
+                                                         self.names[row], self.ids[row]))
+
+    def contacts(self, rows):
+        """Return the Contact objects for *rows*, in order."""
+        return [self.objects[row] for row in rows]
@@ -0,0 +1,21 @@
+# Gunicorn settings for running the contact manager on several cores.
+#
+#   SHARED_STATE=1 CONTACT_STORE=postgres gunicorn app:app
+#
+# Every worker imports app.py itself (no preload), loads the contact book from
+# the database and then follows the change table, so all workers serve the
+# same data. Without SHARED_STATE each worker would hold its own diverging copy
+# of the contacts, so a single worker is used and asking for more is an error.
+import multiprocessing
+import os
+
+SHARED_STATE = os.getenv('SHARED_STATE', '0') == '1'
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() if SHARED_STATE else 1))
+if workers > 1 and not SHARED_STATE:
+    raise RuntimeError('GUNICORN_WORKERS > 1 needs SHARED_STATE=1 (and a CONTACT_STORE) '
+                       'so the workers share one copy of the contacts')
+# Readers share the in-process lock, so a few threads per worker help page views
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+preload_app = False
@@ -0,0 +1,40 @@
+"""Bulk-load contacts from a CSV or JSON Lines file, then start the app.
+
+Usage:
+    python import_contacts.py contacts.csv
+    python import_contacts.py contacts.jsonl --no-serve
+
+The file is streamed row by row and inserted into the default contact book
+as a single batch, exactly like an upload to ``POST /import``.
+"""
+import argparse
+import time
+
+from app import app, default_book, import_format_for
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk-import contacts into the contact manager.')
+    parser.add_argument('path', help='CSV or JSON Lines file to import')
+    parser.add_argument('--format', choices=['csv', 'jsonl'],
+                        help='input format (default: inferred from the file extension)')
+    parser.add_argument('--no-serve', action='store_true',
+                        help='import and report timing without starting the web server')
+    args = parser.parse_args(argv)
+
+    fmt = args.format or import_format_for(args.path)
+    start_time = time.perf_counter()
+    rejected = []
+    with open(args.path, encoding='utf-8', newline='') as stream:
+        batch = default_book.bulk_import(stream, fmt, rejected)
+    elapsed = time.perf_counter() - start_time
+    print(f"Imported {len(batch):,} contacts in {elapsed:.3f} seconds")
+    if rejected:
+        print(f"Skipped {len(rejected):,} invalid rows (first: {', '.join(map(str, rejected[:10]))})")
+
+    if not args.no_serve:
+        app.run(host='0.0.0.0', port=5000, debug=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Sorted, case-insensitive name index shared by the app and the benchmark suite.
+
+Names are casefolded once on insert and kept in a sorted array with the
+original items in a parallel array, so lookups are plain ``bisect`` calls
+on precomputed keys instead of lowering a string at every probe.
+"""
+import bisect
+
+from sorting import merge_sort
+
+# Sorts after every real character, used to bound prefix ranges
+_MAX_CHAR = chr(0x10FFFF)
+
+
+def normalize_name(name):
+    """Return the comparison key for *name* (trimmed and casefolded)."""
+    return name.strip().casefold()
+
+
+class SortedNameIndex:
+    """Items kept sorted by casefolded name in parallel key/item arrays.
+
+    *key* extracts the name from an item (defaults to the item itself, for
+    plain strings). Exact, prefix and batch lookups are O(log n) each;
+    inserts and deletes keep the arrays sorted with ``bisect``.
+    """
+    def __init__(self, items=(), key=None):
+        self.key = key or (lambda item: item)
+        items = merge_sort(items, key=lambda item: normalize_name(self.key(item)))
+        self.keys = [normalize_name(self.key(item)) for item in items]
+        self.items = items
+
+    def add(self, item):
+        """Insert an item after any existing items with the same name."""
+        name_key = normalize_name(self.key(item))
+        i = bisect.bisect_right(self.keys, name_key)
+        self.keys.insert(i, name_key)
+        self.items.insert(i, item)
+
+    def add_many(self, items):
+        """Insert a batch of items with one sort and a linear merge."""
+        batch = merge_sort(items, key=lambda item: normalize_name(self.key(item)))
+        batch_keys = [normalize_name(self.key(item)) for item in batch]
+        keys, merged = [], []
+        i = j = 0
+        while i < len(self.keys) and j < len(batch_keys):
+            # Existing items stay ahead of new ones with the same name, as in add()
+            if batch_keys[j] < self.keys[i]:
+                keys.append(batch_keys[j])
+                merged.append(batch[j])
+                j += 1
+            else:
+                keys.append(self.keys[i])
+                merged.append(self.items[i])
+                i += 1
+        keys.extend(self.keys[i:])
+        merged.extend(self.items[i:])
+        keys.extend(batch_keys[j:])
+        merged.extend(batch[j:])
+        self.keys = keys
+        self.items = merged
+
+    def remove(self, item):
+        """Remove *item* (matched by identity). Returns False if absent."""
+        name_key = normalize_name(self.key(item))
+        lo = bisect.bisect_left(self.keys, name_key)
+        hi = bisect.bisect_right(self.keys, name_key, lo)
+        for i in range(lo, hi):
+            if self.items[i] is item:
+                del self.keys[i]
+                del self.items[i]
+                return True
+        return False
+
+    def remove_many(self, items):
+        """Remove a batch of items (matched by identity) in one pass."""
+        doomed = {id(item) for item in items}
+        kept = [i for i, item in enumerate(self.items) if id(item) not in doomed]
+        self.keys = [self.keys[i] for i in kept]
+        self.items = [self.items[i] for i in kept]
+
+    def find(self, name):
+        """Return ``(index, item)`` for the first item named *name*, or None."""
+        name_key = normalize_name(name)
+        i = bisect.bisect_left(self.keys, name_key)
+        if i < len(self.keys) and self.keys[i] == name_key:
+            return (i, self.items[i])
+        return None
+
+    def find_all(self, name):
+        """Return every item named *name*, in index order."""
+        name_key = normalize_name(name)
+        lo = bisect.bisect_left(self.keys, name_key)
+        hi = bisect.bisect_right(self.keys, name_key, lo)
+        return self.items[lo:hi]
+
+    def find_prefix(self, prefix, limit=None):
+        """Return items whose name starts with *prefix*, in name order."""
+        prefix_key = normalize_name(prefix)
+        lo = bisect.bisect_left(self.keys, prefix_key)
+        hi = bisect.bisect_left(self.keys, prefix_key + _MAX_CHAR, lo)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self.items[lo:hi]
+
+    def find_many(self, names):
+        """Look up many names at once.
+
+        Returns a dict mapping each name to ``(index, item)`` or None. The
+        queries are sorted first so each search starts where the previous
+        one ended, narrowing the bisect window as the batch proceeds.
+        """
+        results = {}
+        lo = 0
+        for name_key, name in merge_sort((normalize_name(name), name) for name in names):
+            lo = bisect.bisect_left(self.keys, name_key, lo)
+            if lo < len(self.keys) and self.keys[lo] == name_key:
+                results[name] = (lo, self.items[lo])
+            else:
+                results[name] = None
+        return results
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
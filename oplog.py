@@ -0,0 +1,227 @@
+"""Append-only operation log with snapshots, for fast crash recovery.
+
+Every contact write is appended to a JSON Lines log segment as a
+``save`` (full contact) or ``delete`` (ID only) record with a sequence
+number, so replaying records is idempotent. Appends are fsynced in
+batches. After every *snapshot_every* records the current segment is
+closed, a snapshot of the full contact set is written in the background,
+and segments it covers are deleted. Recovery loads the newest snapshot
+and replays only the records after it.
+
+Files in the log directory:
+    snapshot.jsonl              header line {"seq": N, "count": M}, then one contact per line
+    oplog-<first seq>.jsonl     log segments, replayed in name order
+"""
+import json
+import os
+import threading
+import time
+
+SNAPSHOT_FILE = 'snapshot.jsonl'
+SEGMENT_PREFIX = 'oplog-'
+SEGMENT_SUFFIX = '.jsonl'
+
+
+def contact_record(contact):
+    """Serialize a contact's persistent fields."""
+    return {'id': contact.id, 'name': contact.name,
+            'category_path': list(contact.category_path), 'priority': contact.priority}
+
+
+class OperationLog:
+    """Durable log of contact saves and deletes.
+
+    It offers the same ``save_many``/``delete_many`` calls as a
+    ContactStore. *snapshot_source* is a callable returning every live
+    contact; it is called at snapshot time from the writing thread.
+    Records are fsynced once *fsync_every* are waiting, and otherwise at
+    most *fsync_interval* seconds after they were written (by a timer when
+    no further write comes along). Set *snapshot_every* to 0 to snapshot
+    only on request.
+    """
+    def __init__(self, directory, snapshot_source, fsync_every=100, fsync_interval=1.0,
+                 snapshot_every=100000):
+        self.directory = directory
+        self.snapshot_source = snapshot_source
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.lock = threading.Lock()
+        self.seq = 0  # sequence number of the last record written
+        self.unsynced = 0  # records written since the last fsync
+        self.last_sync = time.monotonic()
+        self.since_snapshot = 0
+        self.snapshot_thread = None
+        self.sync_timer = None
+        self.segment = None
+
+    # -- recovery -----------------------------------------------------------
+
+    def _segments(self):
+        if not os.path.isdir(self.directory):
+            return []
+        names = [name for name in os.listdir(self.directory)
+                 if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)]
+        return [os.path.join(self.directory, name) for name in sorted(names)]
+
+    def recover(self):
+        """Rebuild the contact set from the latest snapshot plus the log tail.
+
+        Returns a list of ``(id, name, category_path, priority)`` tuples and
+        leaves the log ready for appends. A torn final line from a crash
+        mid-write is truncated away, so records appended after recovery
+        are not glued onto it.
+        """
+        state = {}
+        snapshot_seq = 0
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, encoding='utf-8') as stream:
+                snapshot_seq = json.loads(stream.readline())['seq']
+                for line in stream:
+                    record = json.loads(line)
+                    state[record['id']] = record
+        self.seq = snapshot_seq
+
+        for path in self._segments():
+            with open(path, 'rb+') as stream:
+                offset = 0
+                for line in stream:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError('unterminated record')
+                        record = json.loads(line)
+                    except ValueError:
+                        # Cut the torn record off so new appends start on a clean line
+                        stream.truncate(offset)
+                        break
+                    offset += len(line)
+                    if record['seq'] <= snapshot_seq:
+                        continue
+                    if record['op'] == 'save':
+                        state[record['contact']['id']] = record['contact']
+                    else:
+                        state.pop(record['id'], None)
+                    self.seq = record['seq']
+            self.since_snapshot = self.seq - snapshot_seq
+
+        return [(record['id'], record['name'], record['category_path'], record['priority'])
+                for record in state.values()]
+
+    # -- appends ------------------------------------------------------------
+
+    def _open_segment(self):
+        # Created on the first write, so a log that is only read leaves nothing behind
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{self.seq + 1:012d}{SEGMENT_SUFFIX}")
+        self.segment = open(path, 'a', encoding='utf-8')
+
+    def _append(self, records):
+        with self.lock:
+            if self.segment is None:
+                self._open_segment()
+            for record in records:
+                self.seq += 1
+                record['seq'] = self.seq
+                self.segment.write(json.dumps(record, separators=(',', ':')) + '\n')
+                self.unsynced += 1
+                self.since_snapshot += 1
+            if (self.unsynced >= self.fsync_every
+                    or time.monotonic() - self.last_sync >= self.fsync_interval):
+                self._sync()
+            elif self.sync_timer is None:
+                # Sync the rest of a burst once the interval passes, even if no more writes come
+                self.sync_timer = threading.Timer(self.fsync_interval, self._timed_sync)
+                self.sync_timer.daemon = True
+                self.sync_timer.start()
+            if self.snapshot_every and self.since_snapshot >= self.snapshot_every:
+                self._start_snapshot()
+
+    def _sync(self):
+        self.segment.flush()
+        os.fsync(self.segment.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def _timed_sync(self):
+        with self.lock:
+            self.sync_timer = None
+            if self.segment is not None and self.unsynced:
+                self._sync()
+
+    def save_many(self, contacts):
+        """Append a save record for each contact."""
+        self._append({'op': 'save', 'contact': contact_record(contact)} for contact in contacts)
+
+    def delete_many(self, contact_ids):
+        """Append a delete record for each contact ID."""
+        self._append({'op': 'delete', 'id': contact_id} for contact_id in contact_ids)
+
+    # -- snapshots ----------------------------------------------------------
+
+    def _start_snapshot(self):
+        """Rotate to a new segment and snapshot the current state in the background.
+
+        Must be called with the lock held, right after the last record of
+        the state that *snapshot_source* will return.
+        """
+        if self.snapshot_thread is not None and self.snapshot_thread.is_alive():
+            return
+        self._sync()
+        self.segment.close()
+        snapshot_seq = self.seq
+        # Only the contact list is copied here; serializing happens on the
+        # snapshot thread. Later edits to these contacts are in the new
+        # segment, so replay corrects anything the snapshot catches mid-change.
+        snapshot_contacts = list(self.snapshot_source())
+        self._open_segment()
+        # Listed after the rotation: an empty segment reopens under its own
+        # name, and the active segment must never be deleted
+        covered = [path for path in self._segments() if path != self.segment.name]
+        self.since_snapshot = 0
+        self.snapshot_thread = threading.Thread(target=self._write_snapshot,
+                                                args=(snapshot_seq, snapshot_contacts, covered),
+                                                name='contact-snapshot', daemon=True)
+        self.snapshot_thread.start()
+
+    def _write_snapshot(self, snapshot_seq, snapshot_contacts, covered):
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as stream:
+            stream.write(json.dumps({'seq': snapshot_seq, 'count': len(snapshot_contacts)}) + '\n')
+            for contact in snapshot_contacts:
+                stream.write(json.dumps(contact_record(contact), separators=(',', ':')) + '\n')
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.replace(temp_path, path)
+        # The snapshot now covers these segments, so they are no longer needed
+        for segment_path in covered:
+            os.remove(segment_path)
+
+    def snapshot(self):
+        """Force a snapshot now and wait for it to be written."""
+        with self.lock:
+            if not self.seq:
+                # Give the snapshot a sequence number of its own, so recovery
+                # never mistakes it for an empty log
+                self.seq = 1
+            if self.segment is None:
+                self._open_segment()
+            self._start_snapshot()
+            thread = self.snapshot_thread
+        if thread is not None:
+            thread.join()
+
+    def close(self):
+        """Fsync outstanding records and wait for any snapshot in progress."""
+        with self.lock:
+            if self.sync_timer is not None:
+                self.sync_timer.cancel()
+                self.sync_timer = None
+            if self.segment is not None:
+                self._sync()
+                self.segment.close()
+                self.segment = None
+            thread = self.snapshot_thread
+        if thread is not None:
+            thread.join()
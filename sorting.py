@@ -0,0 +1,168 @@
+"""Sorting routines shared by the app and the benchmark suite.
+
+``merge_sort`` replaces the old recursive ``quick_sort``: it computes each
+element's key exactly once, sorts an array of positions with insertion-sorted
+runs merged bottom-up (no recursion, so no stack limit), and is stable, so
+equal keys keep their input order.
+
+Time Complexity: O(n log n) worst case.
+Space Complexity: O(n) for the keys and two position buffers.
+
+``sort_in_place`` is the allocation-light variant for lists: it merges by
+rotating elements within the list, trading O(n log² n) time for no
+buffers beyond the computed keys.
+"""
+
+# Length of the runs that are insertion-sorted before merging starts
+RUN_LENGTH = 32
+
+
+def _sorted_positions(keys):
+    """Return the positions of *keys* in stable ascending key order."""
+    n = len(keys)
+    order = list(range(n))
+
+    # Insertion-sort fixed-size runs
+    for start in range(0, n, RUN_LENGTH):
+        end = min(start + RUN_LENGTH, n)
+        for i in range(start + 1, end):
+            pos = order[i]
+            pos_key = keys[pos]
+            j = i - 1
+            while j >= start and pos_key < keys[order[j]]:
+                order[j + 1] = order[j]
+                j -= 1
+            order[j + 1] = pos
+
+    # Merge runs bottom-up, ping-ponging between two buffers
+    buffer = [0] * n
+    width = RUN_LENGTH
+    while width < n:
+        for lo in range(0, n, 2 * width):
+            mid = min(lo + width, n)
+            hi = min(lo + 2 * width, n)
+            if mid >= hi or not keys[order[mid]] < keys[order[mid - 1]]:
+                # Single run, or the two runs are already in order
+                buffer[lo:hi] = order[lo:hi]
+                continue
+            i, j, k = lo, mid, lo
+            while i < mid and j < hi:
+                # Take from the right run only when strictly smaller (stability)
+                if keys[order[j]] < keys[order[i]]:
+                    buffer[k] = order[j]
+                    j += 1
+                else:
+                    buffer[k] = order[i]
+                    i += 1
+                k += 1
+            buffer[k:hi] = order[i:mid] if i < mid else order[j:hi]
+        order, buffer = buffer, order
+        width *= 2
+    return order
+
+
+def merge_sort(arr, key=None, reverse=False):
+    """Return a new stably sorted list of the items in *arr*.
+
+    Works like the built-in ``sorted``: *key* is called once per element and
+    only ``<`` is used to compare keys. With *reverse* the order is
+    descending while equal keys still keep their input order.
+    """
+    items = list(arr)
+    if reverse:
+        items.reverse()
+    keys = items if key is None else [key(item) for item in items]
+    result = [items[pos] for pos in _sorted_positions(keys)]
+    if reverse:
+        result.reverse()
+    return result
+
+
+def _reverse(lists, lo, hi):
+    """Reverse ``[lo, hi)`` of every list in *lists* by swapping elements."""
+    hi -= 1
+    while lo < hi:
+        for values in lists:
+            values[lo], values[hi] = values[hi], values[lo]
+        lo += 1
+        hi -= 1
+
+
+def _merge_in_place(lists, keys, lo, mid, hi):
+    """Stably merge the sorted runs ``[lo, mid)`` and ``[mid, hi)`` without a buffer.
+
+    Splits the longer run in half, binary-searches the matching cut in the
+    other run and rotates the middle pieces into place (three reversals),
+    leaving two smaller merges. A stack replaces the recursion.
+    """
+    stack = [(lo, mid, hi)]
+    while stack:
+        lo, mid, hi = stack.pop()
+        if lo == mid or mid == hi or not keys[mid] < keys[mid - 1]:
+            continue
+        if mid - lo == 1 and hi - mid == 1:
+            for values in lists:
+                values[lo], values[mid] = values[mid], values[lo]
+            continue
+        if mid - lo > hi - mid:
+            first_cut = lo + (mid - lo) // 2
+            # First element of the right run that is not smaller (lower bound)
+            low, high = mid, hi
+            while low < high:
+                middle = (low + high) // 2
+                if keys[middle] < keys[first_cut]:
+                    low = middle + 1
+                else:
+                    high = middle
+            second_cut = low
+        else:
+            second_cut = mid + (hi - mid) // 2
+            # First element of the left run that is larger (upper bound)
+            low, high = lo, mid
+            while low < high:
+                middle = (low + high) // 2
+                if keys[second_cut] < keys[middle]:
+                    high = middle
+                else:
+                    low = middle + 1
+            first_cut = low
+        # Rotate [first_cut, mid) behind [mid, second_cut)
+        _reverse(lists, first_cut, mid)
+        _reverse(lists, mid, second_cut)
+        _reverse(lists, first_cut, second_cut)
+        new_mid = first_cut + (second_cut - mid)
+        stack.append((lo, first_cut, new_mid))
+        stack.append((new_mid, second_cut, hi))
+
+
+def sort_in_place(arr, key=None, reverse=False):
+    """Sort the list *arr* in place (stable), like ``list.sort``.
+
+    Unlike ``merge_sort`` no copy of the items or position buffers is
+    made: runs are insertion-sorted and then merged by rotations inside
+    *arr* itself, in O(n log² n) time. With *key*, the keys are computed
+    once into one list that is permuted alongside *arr*.
+    """
+    if reverse:
+        # Reversing before and after keeps equal keys in input order
+        arr.reverse()
+    n = len(arr)
+    keys = arr if key is None else [key(item) for item in arr]
+    lists = (arr,) if key is None else (arr, keys)
+
+    for start in range(0, n, RUN_LENGTH):
+        end = min(start + RUN_LENGTH, n)
+        for i in range(start + 1, end):
+            j = i
+            while j > start and keys[j] < keys[j - 1]:
+                for values in lists:
+                    values[j], values[j - 1] = values[j - 1], values[j]
+                j -= 1
+
+    width = RUN_LENGTH
+    while width < n:
+        for lo in range(0, n - width, 2 * width):
+            _merge_in_place(lists, keys, lo, lo + width, min(lo + 2 * width, n))
+        width *= 2
+    if reverse:
+        arr.reverse()
@@ -0,0 +1,545 @@
+"""Persistent contact storage for the contact manager, built on SQLAlchemy Core.
+
+The in-memory tree, BST and heaps stay the source of truth while the app
+runs; this module mirrors every contact into a database table so state
+survives restarts and can be reloaded in a single bulk query.
+
+Postgres, MSSQL and SQLite share one implementation (``ContactStore``);
+the subclasses only tune engine creation. ``create_store`` picks one by name.
+
+With *track_changes* every write also appends to a ``contact_changes``
+table in the same transaction, so several app processes sharing one
+database can poll it and apply each other's writes (see ``changes_since``).
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import (Column, Float, Index, Integer, MetaData, String, Table, Unicode,
+                        create_engine, delete, func, insert, inspect, or_, select, text, update)
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.pool import StaticPool
+
+logger = logging.getLogger(__name__)
+
+# Separates category levels in the stored path. A control character cannot
+# appear in names typed into the form, so prefix matching stays unambiguous.
+PATH_SEPARATOR = '\x1f'
+
+# Column limits; the app rejects contacts that do not fit before storing them
+NAME_LENGTH = 255
+# Kept under MSSQL's 1700-byte index key limit (nvarchar uses 2 bytes per char)
+CATEGORY_PATH_LENGTH = 800
+PRIORITY_MIN, PRIORITY_MAX = -2**31, 2**31 - 1  # the range of an Integer column
+
+metadata = MetaData()
+
+contacts_table = Table(
+    'contacts', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=False),
+    # Contact book the contact belongs to; '' is the default, shared book
+    Column('owner', Unicode(64), nullable=False, default=''),
+    # Unicode maps to NVARCHAR on MSSQL, so non-Latin names survive on every backend
+    Column('name', Unicode(NAME_LENGTH), nullable=False),
+    Column('name_lower', Unicode(NAME_LENGTH), nullable=False),
+    Column('category_path', Unicode(CATEGORY_PATH_LENGTH), nullable=False, default=''),
+    Column('priority', Integer, nullable=False, default=0),
+    Index('ix_contacts_owner', 'owner'),
+    Index('ix_contacts_name_lower', 'name_lower'),
+    # text_pattern_ops lets Postgres use the index for LIKE 'prefix%' scans
+    Index('ix_contacts_category_path', 'category_path',
+          postgresql_ops={'category_path': 'text_pattern_ops'}),
+)
+
+# One row per contact write, in commit-ish order by seq. *origin* names the
+# process that made the write so it can skip its own changes.
+changes_table = Table(
+    'contact_changes', metadata,
+    Column('seq', Integer, primary_key=True, autoincrement=True),
+    Column('contact_id', Integer, nullable=False),
+    Column('owner', Unicode(64), nullable=False, default=''),
+    Column('op', String(6), nullable=False),  # 'save' or 'delete'
+    Column('origin', String(64), nullable=False),
+    Column('changed_at', Float, nullable=False),
+)
+
+# Hands out blocks of contact IDs so processes sharing a database never collide
+id_allocator_table = Table(
+    'contact_id_allocator', metadata,
+    Column('name', String(32), primary_key=True),
+    Column('next_id', Integer, nullable=False),
+)
+
+
+def encode_category_path(category_path):
+    """Encode a list of category levels for the ``category_path`` column."""
+    return PATH_SEPARATOR.join(category_path)
+
+
+def decode_category_path(value):
+    """Decode a ``category_path`` column value back into a list of levels."""
+    return value.split(PATH_SEPARATOR) if value else []
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class ContactStore:
+    """Reads and writes contacts through a pooled SQLAlchemy engine.
+
+    Writes are batched: ``save_many`` and ``delete_many`` send at most
+    *batch_size* rows per statement, all inside one transaction. Reads are
+    either one streamed bulk query (``load_all``) or keyset pages by ID
+    (``load_page``).
+    """
+    name = 'sql'
+
+    def __init__(self, url, pool_size=5, max_overflow=10, batch_size=1000,
+                 track_changes=False, origin=''):
+        self.url = url
+        self.engine = self._create_engine(url, pool_size=pool_size, max_overflow=max_overflow)
+        self.batch_size = batch_size
+        self.track_changes = track_changes
+        self.origin = origin
+
+    def _create_engine(self, url, pool_size, max_overflow):
+        return create_engine(url, pool_size=pool_size, max_overflow=max_overflow,
+                             pool_pre_ping=True)
+
+    def create_schema(self):
+        """Create the tables and indexes that do not exist yet.
+
+        Tables created before contact books existed get their ``owner``
+        column (and its index) added in place, with every existing row in
+        the default book. Safe to run from several processes at once.
+        Returns True if the contacts table was created by this call, so
+        callers can tell a brand-new store from one that was emptied.
+        """
+        created = not inspect(self.engine).has_table(contacts_table.name)
+        try:
+            metadata.create_all(self.engine)
+        except DBAPIError:
+            # Another process created some of the tables first; fill in the rest
+            metadata.create_all(self.engine)
+        for table in (contacts_table, changes_table):
+            if self._has_owner(table):
+                continue
+            # The column type as this backend spells it (NVARCHAR on MSSQL)
+            owner_type = table.c.owner.type.compile(dialect=self.engine.dialect)
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} "
+                                      f"ADD owner {owner_type} NOT NULL DEFAULT ''"))
+            except DBAPIError:
+                if not self._has_owner(table):
+                    raise  # not just another process adding it first
+        for index in contacts_table.indexes:
+            try:
+                index.create(self.engine, checkfirst=True)
+            except DBAPIError:
+                pass  # created by another process in the meantime
+        return created
+
+    def _has_owner(self, table):
+        return 'owner' in {column['name'] for column in inspect(self.engine).get_columns(table.name)}
+
+    @staticmethod
+    def _row(contact):
+        return {
+            'id': contact.id,
+            'owner': contact.owner,
+            'name': contact.name,
+            'name_lower': contact.name.lower(),
+            'category_path': encode_category_path(contact.category_path),
+            'priority': contact.priority,
+        }
+
+    def _batches(self, items):
+        items = list(items)
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
+
+    def _record_changes(self, conn, op, contacts):
+        if self.track_changes and contacts:
+            changed_at = time.time()
+            conn.execute(insert(changes_table), [
+                {'contact_id': contact_id, 'owner': owner, 'op': op,
+                 'origin': self.origin, 'changed_at': changed_at}
+                for contact_id, owner in contacts])
+
+    def save_many(self, contacts):
+        """Insert or replace many contacts in one transaction."""
+        with self.engine.begin() as conn:
+            for batch in self._batches(self._row(contact) for contact in contacts):
+                conn.execute(delete(contacts_table).where(
+                    contacts_table.c.id.in_([row['id'] for row in batch])))
+                conn.execute(insert(contacts_table), batch)
+                self._record_changes(conn, 'save', [(row['id'], row['owner']) for row in batch])
+
+    def delete_many(self, contact_ids, owner=''):
+        """Delete many contacts of one *owner*'s book by ID in one transaction."""
+        with self.engine.begin() as conn:
+            for batch in self._batches(contact_ids):
+                conn.execute(delete(contacts_table).where(contacts_table.c.id.in_(batch)))
+                self._record_changes(conn, 'delete', [(contact_id, owner) for contact_id in batch])
+
+    def load_all(self, owner=None):
+        """Yield ``(id, name, category_path, priority)`` for every stored contact.
+
+        With *owner*, only that contact book is loaded. Uses a single query
+        whose rows are streamed in chunks, so a warm start does not hold two
+        full copies of the table in memory.
+        """
+        query = select(contacts_table.c.id, contacts_table.c.name,
+                       contacts_table.c.category_path, contacts_table.c.priority)
+        if owner is not None:
+            query = query.where(contacts_table.c.owner == owner)
+        with self.engine.connect() as conn:
+            result = conn.execution_options(yield_per=self.batch_size).execute(query)
+            for contact_id, name, category_path, priority in result:
+                yield contact_id, name, decode_category_path(category_path), priority
+
+    def load_page(self, after_id=0, limit=None):
+        """Return up to *limit* ``(id, name, category_path, priority)`` rows with IDs above *after_id*.
+
+        Keyset pagination on the primary key, so every page is an index
+        range scan no matter how deep into the table it starts.
+        """
+        query = (select(contacts_table.c.id, contacts_table.c.name,
+                        contacts_table.c.category_path, contacts_table.c.priority)
+                 .where(contacts_table.c.id > after_id)
+                 .order_by(contacts_table.c.id)
+                 .limit(limit or self.batch_size))
+        with self.engine.connect() as conn:
+            return [(contact_id, name, decode_category_path(category_path), priority)
+                    for contact_id, name, category_path, priority in conn.execute(query)]
+
+    def clear(self):
+        """Delete every stored contact."""
+        with self.engine.begin() as conn:
+            conn.execute(delete(contacts_table))
+
+    def find_by_category_prefix(self, category_path):
+        """Return IDs of contacts filed under *category_path* (including subcategories)."""
+        encoded = encode_category_path(category_path)
+        if not encoded:
+            query = select(contacts_table.c.id)
+        else:
+            pattern = _escape_like(encoded + PATH_SEPARATOR) + '%'
+            query = select(contacts_table.c.id).where(or_(
+                contacts_table.c.category_path == encoded,
+                contacts_table.c.category_path.like(pattern, escape='\\')))
+        with self.engine.connect() as conn:
+            return [row[0] for row in conn.execute(query)]
+
+    def max_id(self):
+        """Return the largest stored contact ID, or 0 if the table is empty."""
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(contacts_table.c.id))).scalar() or 0
+
+    def count(self):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(contacts_table)).scalar()
+
+    def reserve_ids(self, count):
+        """Reserve *count* consecutive contact IDs and return the first one.
+
+        The allocator row is bumped inside a transaction, so concurrent
+        processes always get disjoint blocks. It starts after the highest
+        stored ID the first time it is used.
+        """
+        for _ in range(3):
+            with self.engine.begin() as conn:
+                bumped = conn.execute(
+                    update(id_allocator_table)
+                    .where(id_allocator_table.c.name == contacts_table.name)
+                    .values(next_id=id_allocator_table.c.next_id + count))
+                if bumped.rowcount:
+                    next_id = conn.execute(
+                        select(id_allocator_table.c.next_id)
+                        .where(id_allocator_table.c.name == contacts_table.name)).scalar()
+                    return next_id - count
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(id_allocator_table).values(
+                        name=contacts_table.name, next_id=self.max_id() + 1))
+            except IntegrityError:
+                pass  # another process created the row first; bump it on the next pass
+        raise RuntimeError('Could not reserve contact IDs')
+
+    def latest_change(self):
+        """Return the highest change sequence number, or 0 if none were recorded."""
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(changes_table.c.seq))).scalar() or 0
+
+    def oldest_change(self):
+        """Return the lowest retained change sequence number, or 0 if none remain."""
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.min(changes_table.c.seq))).scalar() or 0
+
+    def changes_since(self, after_seq, also_seqs=(), skip_origin=None):
+        """Return changes with seq above *after_seq* (or in *also_seqs*), oldest first.
+
+        Each change is ``(seq, op, owner, contact_id, row)`` where *row* is the
+        contact's current ``(id, name, category_path, priority)`` for saves,
+        or None for deletes and for saves whose contact is gone again.
+        Changes made by *skip_origin* are returned with op None, so callers
+        can still advance past them.
+        """
+        condition = changes_table.c.seq > after_seq
+        if also_seqs:
+            condition = or_(condition, changes_table.c.seq.in_(list(also_seqs)))
+        query = (select(changes_table.c.seq, changes_table.c.op, changes_table.c.origin,
+                        changes_table.c.owner, changes_table.c.contact_id, contacts_table.c.name,
+                        contacts_table.c.category_path, contacts_table.c.priority)
+                 .select_from(changes_table.outerjoin(
+                     contacts_table, contacts_table.c.id == changes_table.c.contact_id))
+                 .where(condition)
+                 .order_by(changes_table.c.seq))
+        changes = []
+        with self.engine.connect() as conn:
+            for seq, op, origin, owner, contact_id, name, category_path, priority in conn.execute(query):
+                if origin == skip_origin:
+                    op = None
+                row = None
+                if op == 'save' and name is not None:
+                    row = (contact_id, name, decode_category_path(category_path), priority)
+                changes.append((seq, op, owner, contact_id, row))
+        return changes
+
+    def prune_changes(self, older_than):
+        """Delete change records written before the epoch time *older_than*.
+
+        The newest record is always kept, so ``latest_change`` never goes
+        backwards and followers can tell that changes they missed are gone.
+        """
+        newest = select(func.max(changes_table.c.seq)).scalar_subquery()
+        with self.engine.begin() as conn:
+            conn.execute(delete(changes_table).where(changes_table.c.changed_at < older_than,
+                                                     changes_table.c.seq < newest))
+
+
+class PostgresContactStore(ContactStore):
+    """Postgres via psycopg2, with a connection pool sized by the caller."""
+    name = 'postgres'
+
+
+class MSSQLContactStore(ContactStore):
+    """Microsoft SQL Server via pyodbc.
+
+    ``fast_executemany`` makes pyodbc send each batched INSERT as one
+    parameter array instead of a round trip per row.
+    """
+    name = 'mssql'
+
+    def _create_engine(self, url, pool_size, max_overflow):
+        return create_engine(url, pool_size=pool_size, max_overflow=max_overflow,
+                             pool_pre_ping=True, fast_executemany=True)
+
+
+class SQLiteContactStore(ContactStore):
+    """SQLite stand-in for running locally without the database containers.
+
+    ``sqlite:///:memory:`` keeps everything in one shared in-memory
+    connection; file URLs use SQLAlchemy's default SQLite pool.
+    """
+    name = 'sqlite'
+
+    def _create_engine(self, url, pool_size, max_overflow):
+        if url in ('sqlite://', 'sqlite:///:memory:'):
+            return create_engine(url, poolclass=StaticPool,
+                                 connect_args={'check_same_thread': False})
+        return create_engine(url, connect_args={'check_same_thread': False})
+
+
+class WriteBehindQueue:
+    """Applies contact writes to a ContactStore on a background worker thread.
+
+    It offers the same ``save_many``/``delete_many`` calls as a store, but
+    they only record the write and return. Pending writes are coalesced by
+    contact ID, so the latest write for a contact wins and a burst of edits
+    costs one row. The worker flushes them in batches of *batch_size*.
+    Once *max_pending* contacts are waiting, writers block until the worker
+    catches up (backpressure). ``close`` flushes everything and stops the
+    worker, for use at shutdown.
+
+    When a batch fails, its rows are retried one at a time so a row the
+    database rejects cannot hold back the others. A failing row waits
+    *retry_interval* seconds, doubling per attempt up to *max_retry_interval*,
+    before its next try; after *max_attempts* failures it is logged and moved
+    to ``dead_letters`` instead of being retried forever.
+    """
+    def __init__(self, store, max_pending=10000, batch_size=500, retry_interval=1.0,
+                 max_retry_interval=60.0, max_attempts=8):
+        self.store = store
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.max_attempts = max_attempts
+        self.pending = {}  # contact ID -> ('save', contact) or ('delete', owner), oldest first
+        self.retrying = {}  # contact ID -> (entry, failed attempts, monotonic time of next try)
+        self.dead_letters = []  # (contact ID, entry) pairs given up on
+        self.in_flight = 0  # writes taken by the worker but not yet committed
+        self.written = 0  # writes committed so far
+        self.failures = 0  # failed write attempts
+        self.closed = False
+        self.condition = threading.Condition()
+        self.worker = threading.Thread(target=self._run, name='contact-write-behind', daemon=True)
+        self.worker.start()
+
+    def _put(self, entries):
+        with self.condition:
+            for contact_id, entry in entries:
+                while (len(self.pending) + len(self.retrying) >= self.max_pending
+                       and contact_id not in self.pending and contact_id not in self.retrying
+                       and not self.closed):
+                    # Wake the worker before blocking so it can drain the queue
+                    self.condition.notify_all()
+                    self.condition.wait()
+                # A newer write replaces a failing one and starts its attempts afresh
+                self.retrying.pop(contact_id, None)
+                self.pending.pop(contact_id, None)
+                self.pending[contact_id] = entry
+            self.condition.notify_all()
+
+    def save_many(self, contacts):
+        """Queue contacts to be inserted or replaced."""
+        self._put((contact.id, ('save', contact)) for contact in contacts)
+
+    def delete_many(self, contact_ids, owner=''):
+        """Queue contacts of one *owner*'s book to be deleted by ID."""
+        self._put((contact_id, ('delete', owner)) for contact_id in contact_ids)
+
+    @property
+    def depth(self):
+        """Number of writes not yet committed to the store (or given up on)."""
+        return len(self.pending) + len(self.retrying) + self.in_flight
+
+    def _take_batch(self):
+        batch = []
+        for contact_id in self.pending:
+            batch.append(contact_id)
+            if len(batch) == self.batch_size:
+                break
+        return [(contact_id, self.pending.pop(contact_id), 0) for contact_id in batch]
+
+    def _take_due_retries(self):
+        # Once closed, retries no longer wait out their backoff
+        now = time.monotonic()
+        due = [contact_id for contact_id, (_, _, retry_at) in self.retrying.items()
+               if self.closed or retry_at <= now]
+        return [(contact_id,) + self.retrying.pop(contact_id)[:2] for contact_id in due]
+
+    def _write(self, rows):
+        """Write ``(contact ID, entry, attempts)`` rows to the store, deletes first."""
+        saves = [contact for _, (op, contact), _ in rows if op == 'save']
+        deletes = {}
+        for contact_id, (op, owner), _ in rows:
+            if op == 'delete':
+                deletes.setdefault(owner, []).append(contact_id)
+        for owner, contact_ids in deletes.items():
+            self.store.delete_many(contact_ids, owner)
+        if saves:
+            self.store.save_many(saves)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while True:
+                    batch = self._take_due_retries()
+                    if batch or self.pending:
+                        break
+                    if self.closed and not self.retrying:
+                        return
+                    # Sleep until new writes arrive or the earliest retry is due
+                    next_retry = min((retry_at for _, _, retry_at in self.retrying.values()),
+                                     default=None)
+                    self.condition.wait(None if next_retry is None
+                                        else max(next_retry - time.monotonic(), 0))
+                if not batch:
+                    batch = self._take_batch()
+                self.in_flight = len(batch)
+                # Room freed up for writers held back by backpressure
+                self.condition.notify_all()
+
+            failed = []
+            if batch[0][2] == 0:
+                try:
+                    self._write(batch)
+                except Exception:
+                    logger.warning('Write-behind flush of %d contacts failed; retrying them one by one',
+                                   len(batch), exc_info=True)
+                    failed = batch
+            else:
+                failed = batch
+            written = len(batch) - len(failed)
+            if failed:
+                # Retried rows are written alone, so one bad row only fails itself
+                failed = [row for row in failed if not self._write_alone(row)]
+                written = len(batch) - len(failed)
+
+            with self.condition:
+                self.written += written
+                self.failures += len(failed)
+                now = time.monotonic()
+                for contact_id, entry, attempts in failed:
+                    attempts += 1
+                    if contact_id in self.pending:
+                        continue  # superseded by a newer write while this one was tried
+                    if attempts >= self.max_attempts:
+                        logger.error('Giving up on the write-behind %s of contact %s after %d attempts',
+                                     entry[0], contact_id, attempts)
+                        self.dead_letters.append((contact_id, entry))
+                        continue
+                    delay = min(self.retry_interval * 2 ** (attempts - 1), self.max_retry_interval)
+                    self.retrying[contact_id] = (entry, attempts, now + delay)
+                self.in_flight = 0
+                self.condition.notify_all()
+
+    def _write_alone(self, row):
+        """Write a single row, returning False if the store rejected it."""
+        try:
+            self._write([row])
+            return True
+        except Exception:
+            logger.warning('Write-behind %s of contact %s failed (attempt %d)',
+                           row[1][0], row[0], row[2] + 1, exc_info=True)
+            return False
+
+    def flush(self, timeout=None):
+        """Block until every queued write is committed or given up on. Returns False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.depth == 0, timeout)
+
+    def close(self, timeout=30.0):
+        """Flush outstanding writes and stop the worker thread, waiting at most *timeout* seconds.
+
+        Failing rows skip their backoff once closed. Returns False if the
+        worker had not finished in time; its remaining writes are lost.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.worker.join(timeout)
+        if self.worker.is_alive():
+            logger.error('Write-behind queue closed with %d writes not committed', self.depth)
+            return False
+        return True
+
+
+BACKENDS = {
+    PostgresContactStore.name: PostgresContactStore,
+    MSSQLContactStore.name: MSSQLContactStore,
+    SQLiteContactStore.name: SQLiteContactStore,
+}
+
+
+def create_store(backend, url, **options):
+    """Create the ContactStore for *backend* ('postgres', 'mssql' or 'sqlite')."""
+    try:
+        store_class = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown contact store backend: {backend!r}") from None
+    return store_class(url, **options)